@@ -0,0 +1,217 @@
+# Copyright (c) Yutsuten <https://github.com/Yutsuten>. Licensed under AGPL-3.0.
+# See the LICENCE file in the repository root for full licence text.
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Any, NamedTuple, Sequence
+
+from .bar_state import EASES, LIFE_SCALE, answer_table
+
+try:
+    import numpy as np
+except ImportError:  # Not available in every Anki installation
+    np = None
+
+if TYPE_CHECKING:
+    from anki.collection import Collection
+
+SESSION_GAP = 300_000  # Milliseconds. A longer pause between answers starts a new session
+MAX_LIFE_RANGE = (1, 10000)  # Seconds, as allowed in the Deck Settings
+RECOVER_GRID = (0, 1, 2, 3, 4, 5, 6, 8, 10, 12, 15, 20, 25, 30)
+LEARN_REVLOG, RELEARN_REVLOG = 0, 2  # As revlog.type
+
+REVLOG_QUERY = '''
+SELECT r.id, r.cid, r.ease, r.time, r.type
+FROM revlog r JOIN cards c ON c.id = r.cid
+WHERE (c.did IN ({ids}) OR c.odid IN ({ids})) AND r.ease BETWEEN 1 AND 4
+ORDER BY r.id
+'''
+
+
+class Reviews(NamedTuple):
+    """The answers given in a deck, oldest first.
+
+    Each field has one entry per answer. They are NumPy arrays if NumPy is
+    available, and lists otherwise.
+    """
+    timestamp: Sequence[int]  # Milliseconds since epoch
+    answer_time: Sequence[int]  # Milliseconds spent on the card
+    ease: Sequence[int]
+    card_type: Sequence[int]  # As Card.type: 0 new, 1 learning, 2 review, 3 relearning
+
+
+class Suggestion(NamedTuple):
+    """Deck settings expected to reach the target game over rate."""
+    recover: int
+    max_life: int
+    game_over_rate: float
+
+
+class Analysis(NamedTuple):
+    """The result of replaying a deck's review history."""
+    reviews: int
+    sessions: int
+    current_rate: float  # Game over rate with the current settings
+    suggestions: list[Suggestion]
+
+
+def load_reviews(col: Collection, deck_ids: Sequence[int]) -> Reviews:
+    """Reads the answers given in some decks, with a single query.
+
+    Args:
+        col: Anki's collection.
+        deck_ids: The decks, usually a deck and its subdecks.
+    """
+    ids = ','.join(str(int(deck_id)) for deck_id in deck_ids)
+    rows = col.db.all(REVLOG_QUERY.format(ids=ids))
+    if np is not None:
+        table = np.array(rows, dtype=np.int64).reshape(-1, 5)
+        card_ids, revlog_types = table[:, 1], table[:, 4]
+        first_answer = np.zeros(len(table), dtype=bool)
+        first_answer[np.unique(card_ids, return_index=True)[1]] = True
+        card_type = np.select(
+            [revlog_types == LEARN_REVLOG, revlog_types == RELEARN_REVLOG],
+            [np.where(first_answer, 0, 1), 3], 2)
+        return Reviews(table[:, 0], table[:, 3], table[:, 2], card_type)
+
+    seen: set[int] = set()
+    card_type = []
+    for _, card_id, _, _, revlog_type in rows:
+        if revlog_type == LEARN_REVLOG:
+            card_type.append(1 if card_id in seen else 0)
+        else:
+            card_type.append(3 if revlog_type == RELEARN_REVLOG else 2)
+        seen.add(card_id)
+    return Reviews(
+        [row[0] for row in rows], [row[3] for row in rows], [row[2] for row in rows], card_type)
+
+
+def analyze(reviews: Reviews, conf: dict[str, Any], target: float, *,
+            stop_on_answer: bool=False) -> Analysis:
+    """Replays the answers of a deck to find settings that reach a game over rate.
+
+    Answers less than SESSION_GAP apart belong to the same session, and every
+    session starts with full life. The game over rate is the fraction of
+    sessions in which life reached zero. For each recover value, the smallest
+    maximum life reaching the target rate is suggested, keeping the damage of
+    the current settings. With a custom answer matrix, the recover value does
+    not change the answers, so only the current settings are analyzed.
+
+    Args:
+        reviews: The answers, as given by `load_reviews`.
+        conf: The deck's current configuration.
+        target: The wanted game over rate, between 0 and 1.
+        stop_on_answer: Is the drain stopped while the answer is shown?
+    """
+    peaks_of = _session_peaks_numpy if np is not None else _session_peaks_python
+    recover_grid = [round(conf['recover'])]
+    if conf['answerMatrix'] is None:
+        recover_grid = sorted({*RECOVER_GRID, *recover_grid})
+
+    sessions = 0
+    current_rate = 0.0
+    suggestions = []
+    for recover in recover_grid:
+        table = answer_table({**conf, 'recover': recover})
+        peaks = peaks_of(reviews, table, stop_on_answer=stop_on_answer)
+        sessions = len(peaks)
+        if sessions == 0:
+            break
+        max_life = _max_life_for_rate(peaks, target)
+        suggestions.append(Suggestion(recover, max_life, _game_over_rate(peaks, max_life)))
+        if recover == round(conf['recover']):
+            current_rate = _game_over_rate(peaks, conf['maxLife'])
+    return Analysis(len(reviews.timestamp), sessions, current_rate, suggestions)
+
+
+def _max_life_for_rate(peaks: Sequence[int], target: float) -> int:
+    """Gets the smallest maximum life, in seconds, with a game over rate up to target.
+
+    Args:
+        peaks: The largest life lost in each session, sorted.
+        target: The wanted game over rate.
+    """
+    allowed = int(target * len(peaks))  # Sessions that may reach zero
+    if allowed >= len(peaks):
+        return MAX_LIFE_RANGE[0]
+    needed = int(peaks[len(peaks) - allowed - 1]) // LIFE_SCALE + 1
+    return min(max(needed, MAX_LIFE_RANGE[0]), MAX_LIFE_RANGE[1])
+
+
+def _game_over_rate(peaks: Sequence[int], max_life: float) -> float:
+    """Gets the fraction of sessions whose largest life lost reaches max_life seconds."""
+    reached = len(peaks) - bisect_left(peaks, round(max_life * LIFE_SCALE))
+    return reached / len(peaks)
+
+
+def _session_peaks_numpy(reviews: Reviews, table: Sequence[int], *,
+                         stop_on_answer: bool) -> Any:
+    """Computes the largest life lost in each session, with NumPy.
+
+    The life lost since the last time life was full follows Lindley's
+    recursion, lost = max(0, lost + drain - gain), which is the cumulative sum
+    of drain - gain minus its running minimum. The running minimum is kept
+    within each session by shifting every session far below the previous one.
+    As the lower limit of life (zero) does not matter until life reaches zero
+    for the first time, the result holds for any maximum life.
+
+    Args:
+        reviews: The answers.
+        table: The life change of each answer, as given by `bar_state.answer_table`.
+        stop_on_answer: Is the drain stopped while the answer is shown?
+
+    Returns:
+        The peaks, in LIFE_SCALE units (milliseconds of drain), sorted.
+    """
+    timestamp, answer_time, ease, card_type = (
+        np.asarray(field, dtype=np.int64) for field in reviews)
+    if len(timestamp) == 0:
+        return np.zeros(0, dtype=np.int64)
+    gaps = np.diff(timestamp, prepend=timestamp[0] - SESSION_GAP)
+    new_session = gaps >= SESSION_GAP
+    drain = answer_time if stop_on_answer else np.where(new_session, answer_time, gaps)
+    gain = np.asarray(table, dtype=np.int64)[card_type * len(EASES) + ease - 1]
+
+    starts = np.flatnonzero(new_session)
+    session = np.cumsum(new_session) - 1
+    steps = drain - gain
+    total = np.cumsum(steps)
+    total -= (total[starts] - steps[starts])[session]  # Restart the sum in each session
+    shift = 2 * int(np.abs(total).max()) + 1
+    running_min = np.minimum.accumulate(total - session * shift) + session * shift
+    lost = total - np.minimum(running_min, 0)
+
+    lost_before = np.roll(lost, 1)
+    lost_before[starts] = 0
+    peaks = np.maximum.reduceat(lost_before + drain, starts)
+    peaks.sort()
+    return peaks
+
+
+def _session_peaks_python(reviews: Reviews, table: Sequence[int], *,
+                          stop_on_answer: bool) -> list[int]:
+    """Computes the largest life lost in each session, without NumPy.
+
+    Same as `_session_peaks_numpy`, one answer at a time.
+    """
+    peaks = []
+    lost = peak = 0
+    previous = None
+    for timestamp, answer_time, ease, card_type in zip(*reviews):
+        if previous is None or timestamp - previous >= SESSION_GAP:
+            if previous is not None:
+                peaks.append(peak)
+            lost = peak = 0
+            drain = answer_time
+        else:
+            drain = answer_time if stop_on_answer else timestamp - previous
+        previous = timestamp
+
+        lost += drain
+        peak = max(peak, lost)
+        lost = max(lost - table[card_type * len(EASES) + ease - 1], 0)
+    if previous is not None:
+        peaks.append(peak)
+    peaks.sort()
+    return peaks
@@ -0,0 +1,231 @@
+# Copyright (c) Yutsuten <https://github.com/Yutsuten>. Licensed under AGPL-3.0.
+# See the LICENCE file in the repository root for full licence text.
+
+from __future__ import annotations
+
+from array import array
+from typing import Any, Mapping, Optional
+
+LIFE_SCALE = 1000  # Life is stored as an integer, in thousandths of a second
+CARD_TYPES = ('New', 'Learning', 'Review', 'Relearning')  # As Card.type
+EASES = ('Again', 'Hard', 'Good', 'Easy')
+
+
+def to_life(seconds: Optional[float]) -> int:
+    """Converts a value from the configuration (in seconds) into life.
+
+    Args:
+        seconds: The value in seconds.
+    """
+    return round((seconds or 0) * LIFE_SCALE)
+
+
+def to_seconds(life: int) -> float:
+    """Converts life into seconds, as used by the configuration.
+
+    Args:
+        life: The value in LIFE_SCALE units.
+    """
+    return life / LIFE_SCALE
+
+
+def is_answer_matrix(matrix: Any) -> bool:
+    """Checks that a value is an answer matrix: a row of numbers per card type and ease."""
+    return (
+        isinstance(matrix, list) and len(matrix) == len(CARD_TYPES)
+        and all(
+            isinstance(row, list) and len(row) == len(EASES)
+            and all(isinstance(value, (int, float)) and not isinstance(value, bool)
+                    for value in row)
+            for row in matrix
+        )
+    )
+
+
+def answer_matrix(conf: Mapping[str, Any]) -> list[list[float]]:
+    """Gets the life change of each answer, in seconds, by card type and ease.
+
+    Rows follow CARD_TYPES and columns follow EASES. Positive values heal and
+    negative values damage. Without a custom `answerMatrix`, the matrix is
+    built from `recover` and the damage values: every answer recovers, except
+    Again, which damages when damage is enabled.
+
+    Args:
+        conf: The deck's configuration.
+    """
+    if conf['answerMatrix'] is not None:
+        return conf['answerMatrix']
+    recover = conf['recover']
+    damage = conf['damage']
+    if damage is None:
+        again = [recover] * len(CARD_TYPES)
+    else:
+        damage_new = conf['damageNew'] if conf['damageNew'] is not None else damage
+        damage_learning = (
+            conf['damageLearning'] if conf['damageLearning'] is not None else damage)
+        again = [-damage_new, -damage_learning, -damage, -damage]
+    return [[again_value] + [recover] * (len(EASES) - 1) for again_value in again]
+
+
+def answer_table(conf: Mapping[str, Any]) -> tuple[int, ...]:
+    """Compiles the answer matrix into a flat table of life changes.
+
+    The change of an answer is at `card_type * len(EASES) + ease - 1`.
+
+    Args:
+        conf: The deck's configuration.
+    """
+    return tuple(to_life(value) for row in answer_matrix(conf) for value in row)
+
+
+class BarState:
+    """The life bar of a deck.
+
+    Holds the deck's settings, which only change through the settings dialogs,
+    and its runtime state, which changes while reviewing. All the life values
+    are integers in LIFE_SCALE units, converted from the configuration.
+
+    Attributes:
+        enable: Is Life Drain enabled for the deck?
+        max_value: The maximum life.
+        recover_value: Life recovered by a heal without value, and by bury/suspend.
+        full_recover_speed: Life recovered per second by the Recover button.
+        answer_table: The life change of each answer, as given by `answer_table`.
+        conf: The configuration the settings were read from.
+        current_value: The current life.
+        history: The life at the beginning of the most recent reviews.
+    """
+    CONF_FIELDS = (
+        'enable', 'max_value', 'recover_value', 'full_recover_speed', 'answer_table', 'conf',
+    )
+    RUNTIME_FIELDS = ('current_value', 'history')
+    __slots__ = CONF_FIELDS + RUNTIME_FIELDS
+
+    enable: bool
+    max_value: int
+    recover_value: int
+    full_recover_speed: int
+    answer_table: tuple[int, ...]
+    conf: Mapping[str, Any]
+    current_value: int
+    history: LifeHistory
+
+    def __init__(self, conf: Mapping[str, Any], current_value: int, undo_depth: int):
+        """Creates the life bar of a deck that was not reviewed yet.
+
+        Args:
+            conf: The deck's configuration.
+            current_value: The initial life.
+            undo_depth: How many reviews can be undone.
+        """
+        self.apply_conf(conf)
+        self.current_value = current_value
+        self.history = LifeHistory(undo_depth, current_value)
+
+    def apply_conf(self, conf: Mapping[str, Any]) -> None:
+        """Updates the settings, keeping the runtime state.
+
+        Args:
+            conf: The deck's configuration.
+        """
+        self.enable = conf['enable']
+        self.max_value = max(to_life(conf['maxLife']), LIFE_SCALE)
+        self.recover_value = to_life(conf['recover'])
+        self.full_recover_speed = to_life(conf['fullRecoverSpeed'])
+        self.answer_table = answer_table(conf)
+        self.conf = conf
+
+
+class LifeHistory:
+    """The life at the beginning of the most recent reviews of a deck.
+
+    A ring buffer that keeps the current review and the last `depth` reviews,
+    so its memory usage does not grow with the number of reviews.
+    """
+    __slots__ = ('_pos', '_undoable', '_values')
+
+    def __init__(self, depth: int, life: int):
+        """Creates a history without any reviews to undo.
+
+        Args:
+            depth: How many reviews can be undone.
+            life: The life at the beginning of the current review.
+        """
+        self._values = array('q', [life]) * (depth + 1)
+        self._pos = 0
+        self._undoable = 0
+
+    @property
+    def depth(self) -> int:
+        """How many reviews can be undone."""
+        return len(self._values) - 1
+
+    def set_current(self, life: int) -> None:
+        """Sets the life at the beginning of the current review.
+
+        Args:
+            life: The life.
+        """
+        self._values[self._pos] = life
+
+    def push(self, life: int) -> None:
+        """Advances to the next review.
+
+        Args:
+            life: The life at the beginning of the next review.
+        """
+        self._pos = (self._pos + 1) % len(self._values)
+        self._values[self._pos] = life
+        self._undoable = min(self._undoable + 1, self.depth)
+
+    def pop(self) -> Optional[int]:
+        """Goes back to the previous review.
+
+        Returns:
+            The life at the beginning of the previous review, or None if there
+            is nothing to undo.
+        """
+        if self._undoable == 0:
+            return None
+        self._pos = (self._pos - 1) % len(self._values)
+        self._undoable -= 1
+        return self._values[self._pos]
+
+    def resize(self, depth: int) -> None:
+        """Changes how many reviews can be undone, keeping the most recent ones.
+
+        Args:
+            depth: How many reviews can be undone.
+        """
+        if depth == self.depth:
+            return
+        kept = min(self._undoable, depth)
+        values = self._recent(kept)
+        values.extend(array('q', [values[-1]]) * (depth - kept))
+        self._values = values
+        self._pos = kept
+        self._undoable = kept
+
+    def to_bytes(self) -> bytes:
+        """Serializes the reviews that can be undone and the current one, oldest first."""
+        return self._recent(self._undoable).tobytes()
+
+    @classmethod
+    def from_bytes(cls, depth: int, data: bytes) -> LifeHistory:
+        """Rebuilds a history serialized by `to_bytes`.
+
+        Args:
+            depth: How many reviews can be undone.
+            data: The serialized history. The oldest reviews beyond depth are discarded.
+        """
+        values = array('q')
+        values.frombytes(data)
+        history = cls(depth, values[0])
+        for life in values[1:]:
+            history.push(life)
+        return history
+
+    def _recent(self, count: int) -> array:
+        """Gets the life of the last count reviews and the current one, oldest first."""
+        size = len(self._values)
+        return array('q', (self._values[(self._pos - i) % size] for i in range(count, -1, -1)))
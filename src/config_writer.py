@@ -0,0 +1,140 @@
+# Copyright (c) Yutsuten <https://github.com/Yutsuten>. Licensed under AGPL-3.0.
+# See the LICENCE file in the repository root for full licence text.
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from aqt.addons import AddonManager
+
+META_FILE = 'meta.json'
+WRITE_DELAY = 0.5  # Seconds. Updates within this time are written together
+
+
+class ConfigWriter:
+    """Writes the add-on configuration into its meta.json on a worker thread.
+
+    The content of the file is prepared on the calling (main) thread, from the
+    meta data given by Anki's add-on manager, so the worker thread only writes
+    bytes. The meta data is read once and kept until `discard`, so that saving
+    does not read the disk either. Only the most recent configuration is written: updates submitted
+    while a write is waiting are merged into a single write. The file is
+    replaced atomically, by writing a temporary file and renaming it, so it is
+    never left half written.
+
+    Attributes:
+        error: The exception of the last failed write, returned by `flush`.
+    """
+
+    def __init__(self, addon_manager: AddonManager, module: str,
+                 delay: float=WRITE_DELAY):
+        """Prepares the writer. The worker thread starts with the first update.
+
+        Args:
+            addon_manager: Anki's add-on manager.
+            module: The add-on's module name.
+            delay: Seconds to wait for more updates before writing.
+        """
+        self._addon_manager = addon_manager
+        self._module = module
+        self._delay = delay
+        self._path: Optional[Path] = None
+        self._lock = threading.Lock()
+        self._addon: Optional[str] = None
+        self._meta: Optional[dict[str, Any]] = None
+        self._pending: Optional[bytes] = None
+        self._writing = False
+        self._wakeup = threading.Event()
+        self._hurry = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread: Optional[threading.Thread] = None
+        self.error: Optional[Exception] = None
+
+    def submit(self, conf: dict[str, Any]) -> None:
+        """Schedules a configuration to be written.
+
+        Args:
+            conf: The complete configuration.
+        """
+        if self._addon is None or self._path is None:
+            self._addon = self._addon_manager.addonFromModule(self._module)
+            self._path = Path(self._addon_manager.addonsFolder(self._addon)) / META_FILE
+        if self._meta is None:
+            self._meta = self._addon_manager.addonMeta(self._addon)
+        content = json.dumps({**self._meta, 'config': conf}).encode('utf-8')
+        with self._lock:
+            self._pending = content
+            self._idle.clear()
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='Life Drain config writer', daemon=True)
+            self._thread.start()
+        self._wakeup.set()
+
+    def discard(self, timeout: Optional[float]=None) -> None:
+        """Drops the configuration waiting to be written, if any.
+
+        A write already in progress cannot be stopped, so it is waited for. The
+        meta data is read again by the next `submit`, as it may have changed.
+
+        Args:
+            timeout: Optional. Maximum seconds to wait.
+        """
+        self._meta = None
+        with self._lock:
+            self._pending = None
+            if not self._writing:
+                self._idle.set()
+        self._idle.wait(timeout)
+
+    def flush(self, timeout: Optional[float]=None) -> Optional[Exception]:
+        """Writes the waiting configuration now, and waits until it is written.
+
+        Args:
+            timeout: Optional. Maximum seconds to wait.
+
+        Returns:
+            The error of the last failed write since the previous flush, if any.
+        """
+        self._hurry.set()
+        self._idle.wait(timeout)
+        self._hurry.clear()
+        error, self.error = self.error, None
+        return error
+
+    def _run(self) -> None:
+        """Waits for updates and writes them, until the program exits."""
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self._hurry.wait(self._delay)
+            with self._lock:
+                content, self._pending = self._pending, None
+                self._writing = content is not None
+            if content is not None:
+                try:
+                    self._write(content)
+                except Exception as error:  # noqa: BLE001 (returned by flush)
+                    self.error = error
+            with self._lock:
+                self._writing = False
+                if self._pending is None:
+                    self._idle.set()
+
+    def _write(self, content: bytes) -> None:
+        """Replaces meta.json with the given content."""
+        path = self._path
+        if path is None:
+            return
+        temp_path = path.with_name(f'{path.name}.tmp')
+        with temp_path.open('wb') as temp_file:
+            temp_file.write(content)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        temp_path.replace(path)
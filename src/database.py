@@ -3,31 +3,104 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, ClassVar
+import warnings
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, ClassVar, Mapping, Optional
 
+from .bar_state import is_answer_matrix
+from .config_writer import ConfigWriter
+from .deck_tree import DeckTree
 from .defaults import DEFAULTS
 from .exceptions import GetCollectionError, LoadConfigurationError
 
 if TYPE_CHECKING:
     from aqt.main import AnkiQt
 
+    from .storage import StateStore
+
 
 class GlobalConf:
-    """Manages Life Drain's global configuration."""
+    """Manages Life Drain's global configuration.
+
+    The resolved configuration is kept in memory after the first read, so that
+    the review hot path does not go through the add-on manager. The cache is
+    only dropped by `update` or `invalidate`. Changes are
+    compared with the cache, and nothing is written if nothing changed.
+    Otherwise the cache is updated at once, and the write is left to a
+    ConfigWriter, so that slow disks do not block the user interface.
+
+    Attributes:
+        revision: Incremented whenever the deck defaults may have changed, so
+            that resolved deck configurations can be dropped.
+    """
     FIELDS: ClassVar[set[str]] = {
         'enable', 'stopOnAnswer', 'barPosition', 'barHeight', 'barBorderRadius', 'barText',
         'barStyle', 'barFgColor', 'barTextColor', 'enableBgColor', 'barBgColor',
         'globalSettingsShortcut', 'deckSettingsShortcut', 'pauseShortcut', 'recoverShortcut',
         'behavUndo', 'behavBury', 'behavSuspend', 'stopOnLostFocus', 'shareDrain',
         'barThresholdWarn', 'barFgColorWarn', 'barThresholdDanger', 'barFgColorDanger',
-        'startEmpty', 'invert',
+        'startEmpty', 'invert', 'undoDepth', 'enableDiagnostics',
     }
 
     def __init__(self, mw: AnkiQt):
         self._mw = mw
+        self._cache: Optional[dict[str, Any]] = None
+        self._writer = ConfigWriter(mw.addonManager, __name__)
+        self.revision = 0
 
     def get(self) -> dict[str, Any]:
-        """Get global configuration from Anki's database."""
+        """Get global configuration.
+
+        The returned dictionary is shared by all callers and must not be
+        modified. Use `update` to change the configuration.
+        """
+        if self._cache is None:
+            self._cache = self._load()
+        return self._cache
+
+    def update(self, new_conf: dict[str, Any]) -> set[str]:
+        """Saves global configuration into Anki's database.
+
+        Args:
+            new_conf: The new configuration dictionary.
+
+        Returns:
+            The fields that changed. Nothing is written if there are none.
+        """
+        conf = dict(self.get())
+        changed = set()
+        for field in self.FIELDS | DeckConf.FIELDS:
+            if field in new_conf and new_conf[field] != conf[field]:
+                conf[field] = new_conf[field]
+                changed.add(field)
+        if not changed:
+            return changed
+
+        self._write(conf)
+        if not changed.isdisjoint(DeckConf.FIELDS):
+            self.revision += 1
+        return changed
+
+    def invalidate(self) -> None:
+        """Drops the cached configuration, forcing it to be read again.
+
+        A configuration waiting to be written is discarded, as it is older than
+        the one to be read, and a write in progress is waited for.
+        """
+        self._writer.discard()
+        self._cache = None
+        self.revision += 1
+
+    def flush(self) -> Optional[Exception]:
+        """Waits until the configuration is written into Anki's database.
+
+        Returns:
+            The error of a failed write, if any.
+        """
+        return self._writer.flush()
+
+    def _load(self) -> dict[str, Any]:
+        """Reads the configuration from Anki's database and fills missing fields."""
         conf = self._mw.addonManager.getConfig(__name__)
         if conf is None:
             raise LoadConfigurationError
@@ -38,52 +111,81 @@ class GlobalConf:
         for field in DeckConf.FIELDS:
             if field not in conf:
                 conf[field] = DEFAULTS[field]
+        _check_answer_matrix(conf, 'the global configuration')
         return conf
 
-    def update(self, new_conf: dict[str, Any]) -> None:
-        """Saves global configuration into Anki's database.
+    def _write(self, conf: dict[str, Any]) -> None:
+        """Caches the configuration, and schedules writing it into Anki's database.
 
         Args:
-            new_conf: The new configuration dictionary.
+            conf: The complete configuration dictionary.
         """
-        conf = self._mw.addonManager.getConfig(__name__)
-        if conf is None:
-            raise LoadConfigurationError
-
-        for field in self.FIELDS:
-            if field in new_conf:
-                conf[field] = new_conf[field]
-        for field in DeckConf.FIELDS:
-            conf[field] = new_conf[field]
-        self._mw.addonManager.writeConfig(__name__, conf)
+        self._writer.submit(conf)
+        self._cache = conf
 
 
 class DeckConf:
-    """Manages Life Drain's deck configuration."""
+    """Manages Life Drain's deck configuration.
+
+    The configuration of each deck is a row of the profile's StateStore. The
+    `decks` entry of the global configuration is only read once per profile,
+    to import it into the store.
+
+    A deck without its own configuration inherits the configuration of its
+    nearest configured parent deck (e.g. `Japanese::Vocab` from `Japanese`),
+    and the top level decks inherit the global configuration. The resolved
+    (read-only) configuration of each deck is memoised, using a DeckTree to
+    find the parents. The memo is dropped when the deck defaults of the global
+    configuration change, and only for the affected subtree when a deck is
+    configured, added, renamed or removed. As an answer matrix overrides the
+    recover and damage values, a deck setting its own recover or damage does
+    not inherit the answer matrix of a parent.
+
+    Attributes:
+        store: The profile's StateStore.
+    """
     FIELDS: ClassVar[set[str]] = {
         'enable', 'maxLife', 'recover', 'damage', 'damageNew', 'damageLearning', 'fullRecoverSpeed',
+        'answerMatrix',
+    }
+    ANSWER_FIELDS: ClassVar[set[str]] = {  # A deck setting any of them defines its own answers
+        'recover', 'damage', 'damageNew', 'damageLearning', 'answerMatrix',
     }
 
-    def __init__(self, mw: AnkiQt):
+    def __init__(self, mw: AnkiQt, global_conf: GlobalConf, store: StateStore):
         self._mw = mw
-        self._global_conf = GlobalConf(mw)
+        self._global_conf = global_conf
+        self.store = store
+        self._tree = DeckTree()
+        self._index: dict[int, Mapping[str, Any]] = {}
+        self._index_revision: Optional[int] = None
+
+    def get(self) -> Mapping[str, Any]:
+        """Get current deck configuration.
 
-    def get(self) -> dict:
-        """Get current deck configuration from Anki's database."""
+        The returned mapping is read-only. Use `update` to change it.
+        """
         if self._mw.col is None:
             raise GetCollectionError
+        return self.get_by_id(self._mw.col.decks.get_current_id())
 
-        conf = self._global_conf.get()
-        deck = self._mw.col.decks.current()
-        decks = conf.get('decks', {})
-        deck_conf = decks.get(str(deck['id']), {})
-        conf_dict = {
-            'id': deck['id'],
-            'name': deck['name'],
-        }
-        for field in self.FIELDS:
-            conf_dict[field] = deck_conf.get(field, conf[field])
-        return conf_dict
+    def get_by_id(self, deck_id: int) -> Mapping[str, Any]:
+        """Get a deck's configuration.
+
+        The same mapping is returned until the configuration of the deck, or of
+        one of its parents, changes.
+
+        Args:
+            deck_id: The ID of the deck.
+        """
+        if self._global_conf.revision != self._index_revision:
+            self._index_revision = self._global_conf.revision
+            self._index = {}
+
+        deck_conf = self._index.get(deck_id)
+        if deck_conf is None:
+            deck_conf = self._resolve_inherited(deck_id)
+        return deck_conf
 
     def update(self, new_conf: dict[str, Any]) -> None:
         """Saves deck configuration into Anki's database.
@@ -94,12 +196,92 @@ class DeckConf:
         if self._mw.col is None:
             raise GetCollectionError
 
-        conf = self._global_conf.get()
-        deck = self._mw.col.decks.current()
-        if 'decks' not in conf:
-            conf['decks'] = {}
+        deck_id = self._mw.col.decks.get_current_id()
         deck_conf = {}
         for field in self.FIELDS:
             deck_conf[field] = new_conf[field]
-        conf['decks'][str(deck['id'])] = deck_conf
-        self._mw.addonManager.writeConfig(__name__, conf)
+        if self.store.load_deck_conf(deck_id) != deck_conf:
+            self.store.save_deck_conf(deck_id, deck_conf)
+            self._invalidate(deck_id)
+
+    def build_index(self) -> None:
+        """Indexes the decks of the collection, dropping every resolved configuration."""
+        if self._mw.col is None:
+            raise GetCollectionError
+        self._tree = DeckTree()
+        self._tree.update((deck.name, deck.id) for deck in self._mw.col.decks.all_names_and_ids())
+        self._index_revision = None
+
+    def update_tree(self) -> None:
+        """Indexes the decks added, renamed or removed since the last update."""
+        if self._mw.col is None:
+            raise GetCollectionError
+        changed = self._tree.update(
+            (deck.name, deck.id) for deck in self._mw.col.decks.all_names_and_ids())
+        for deck_id in changed:
+            self._invalidate(deck_id)
+
+    def _invalidate(self, deck_id: int) -> None:
+        """Drops the resolved configuration of a deck and its subdecks."""
+        self._index.pop(deck_id, None)
+        for child in self._tree.descendants(deck_id):
+            self._index.pop(child, None)
+
+    def _resolve_inherited(self, deck_id: int) -> Mapping[str, Any]:
+        """Resolves the configuration of a deck and of its parents not resolved yet.
+
+        Args:
+            deck_id: The ID of the deck.
+        """
+        unresolved = []
+        inherited: Optional[Mapping[str, Any]] = None
+        parent: Optional[int] = deck_id
+        while parent is not None:
+            inherited = self._index.get(parent)
+            if inherited is not None:
+                break
+            unresolved.append(parent)
+            parent = self._tree.parent(parent)
+
+        if inherited is None:
+            inherited = self._global_conf.get()
+        for unresolved_id in reversed(unresolved):
+            deck_conf = self.store.load_deck_conf(unresolved_id) or {}
+            inherited = self._resolve(unresolved_id, deck_conf, inherited)
+            self._index[unresolved_id] = inherited
+        return inherited
+
+    def _resolve(self, deck_id: int, deck_conf: dict[str, Any],
+                 inherited: Mapping[str, Any]) -> Mapping[str, Any]:
+        """Fills a deck's configuration with the inherited values.
+
+        Args:
+            deck_id: The ID of the deck.
+            deck_conf: The deck's own configuration. May be partial or empty.
+            inherited: The resolved configuration of the parent deck, or the
+                global configuration for top level decks.
+        """
+        _check_answer_matrix(deck_conf, f'deck {deck_id}')
+        conf_dict: dict[str, Any] = {'id': deck_id}
+        for field in self.FIELDS:
+            conf_dict[field] = deck_conf.get(field, inherited[field])
+        if 'answerMatrix' not in deck_conf and not self.ANSWER_FIELDS.isdisjoint(deck_conf):
+            conf_dict['answerMatrix'] = None  # E.g. imported from before answer matrices
+        return MappingProxyType(conf_dict)
+
+
+def _check_answer_matrix(conf: dict[str, Any], owner: str) -> None:
+    """Drops an answer matrix of the wrong shape (e.g. edited by hand), with a warning.
+
+    The answers then follow the recover and damage values.
+
+    Args:
+        conf: A configuration, changed in place.
+        owner: Whose configuration it is, for the warning.
+    """
+    matrix = conf.get('answerMatrix')
+    if matrix is not None and not is_answer_matrix(matrix):
+        warnings.warn(
+            f'Life Drain: ignoring the answer matrix of {owner}, which is not '
+            f'4 rows of 4 numbers: {matrix!r}', stacklevel=2)
+        conf['answerMatrix'] = None
@@ -3,20 +3,32 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, Literal, Optional, Union
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Literal, Mapping, Optional
 
 from anki.hooks import runHook
 from aqt.progress import ProgressManager
 
+from .bar_state import LIFE_SCALE, BarState, LifeHistory, to_life, to_seconds
 from .decorators import must_have_active_deck
-from .defaults import BEHAVIORS
+from .drain_core import DrainCore
+from .event_log import ACTION, ANSWER, DAMAGE, DRAIN, HEAL, RECOVER, RESET, SET, UNDO, EventLog
 from .progress_bar import ProgressBar
+from .storage import Snapshot
 
 if TYPE_CHECKING:
     from anki.consts import CardType
     from aqt.main import AnkiQt, MainWindowState
 
     from .database import DeckConf, GlobalConf
+    from .diagnostics import Diagnostics
+
+TIMER_INTERVAL = 100  # Minimum milliseconds between timer ticks
+MAX_TIMER_INTERVAL = 500  # Maximum milliseconds between timer ticks
+MAX_TICK_ELAPSED = 300_000  # Milliseconds. Longer gaps are taken as a system suspend
+MAX_CACHED_DECKS = 32  # Life bars kept in memory. Older ones are moved to the StateStore
+SNAPSHOT_DELAY = 30_000  # Milliseconds. Life changes within this time are written together
 
 
 class DeckManager:
@@ -24,9 +36,22 @@ class DeckManager:
 
     Users may configure each deck with different settings, and the current
     status of the life bar (e.g. current life) will likely differ for each deck.
+    The game rules are implemented by DrainCore, and this class connects them to
+    Anki's timer and the Progress Bar.
+
+    Only the most recently used life bars are kept in memory. The others are
+    written to the profile's StateStore, and read back when their deck is used
+    again. The life bars in memory are also written to the StateStore at most
+    once every SNAPSHOT_DELAY while they change, so they survive a restart.
+
+    Attributes:
+        recovering: Is the life being recovered at the full recover speed?
+        timer: The drain timer.
+        event_log: An instance of EventLog, recording every change of life.
     """
 
-    def __init__(self, mw: AnkiQt, qt: Any, global_conf: GlobalConf, deck_conf: DeckConf):
+    def __init__(self, mw: AnkiQt, qt: Any, global_conf: GlobalConf, deck_conf: DeckConf,
+                 diagnostics: Diagnostics):
         """Initializes a Progress Bar, and keeps Anki's main window reference.
 
         Args:
@@ -34,15 +59,26 @@ class DeckManager:
             qt: The PyQt library.
             global_conf: An instance of GlobalConf.
             deck_conf: An instance of DeckConf.
+            diagnostics: An instance of Diagnostics, measuring the timer.
         """
         self.recovering: bool = False
-        self.timer = ProgressManager(mw).timer(100, self.life_timer, repeat=True, parent=mw)
+        self.timer = ProgressManager(mw).timer(
+            TIMER_INTERVAL, diagnostics.wrap('drain timer', self.life_timer),
+            repeat=False, parent=mw)
         self.timer.stop()
+        self._snapshot_timer = ProgressManager(mw).timer(
+            SNAPSHOT_DELAY, diagnostics.wrap('snapshot timer', self.save_snapshots),
+            repeat=False, parent=mw)
+        self._snapshot_timer.stop()
+        self._changed_decks: set[str] = set()  # Life bars changed since the last snapshot
+        self._last_tick: int = 0
         self._progress_bar = ProgressBar(mw, qt)
         self._global_conf = global_conf
         self._deck_conf = deck_conf
-        self._bar_info: dict[str, dict[str, Any]] = {}
-        self._game_over: bool = False
+        self._bar_info: OrderedDict[str, BarState] = OrderedDict()  # Least recently used first
+        self._core = DrainCore(on_game_over=lambda: runHook('LifeDrain.gameOver'))
+        self.event_log = EventLog()
+        self._store = deck_conf.store
         self._cur_deck_id: Optional[str] = None
 
     def update(self, state: MainWindowState) -> None:
@@ -52,25 +88,53 @@ class DeckManager:
             self._progress_bar.set_visible(visible=False)
         else:
             self._cur_deck_id = self._get_cur_deck_id()
-            if self._cur_deck_id not in self._bar_info:
-                self._add_deck(self._cur_deck_id)
-            bar_info = self._bar_info[self._cur_deck_id]
-            bar_info['history'][bar_info['currentReview']] = bar_info['currentValue']
+            bar_info = self._get_bar_info(self._cur_deck_id)
+            conf = self._get_cur_conf()
+            if bar_info.conf is not conf:  # Changed since, e.g. in a parent deck
+                bar_info.apply_conf(conf)
+                bar_info.current_value = min(bar_info.current_value, bar_info.max_value)
+            self._core.game_over = bar_info.current_value == 0
+            bar_info.history.resize(self._global_conf.get()['undoDepth'])
+            bar_info.history.set_current(bar_info.current_value)
             self._update_progress_bar_style()
-            self._progress_bar.set_max_value(bar_info['maxValue'])
-            self._progress_bar.set_current_value(bar_info['currentValue'])
-            self._progress_bar.set_visible(visible=bar_info['enable'])
+            self._progress_bar.set_max_value(bar_info.max_value)
+            self._progress_bar.set_current_value(bar_info.current_value)
+            self._progress_bar.set_visible(visible=bar_info.enable)
+
+    def save_snapshots(self) -> None:
+        """Writes the life bars changed since the last snapshot to the state store."""
+        self._snapshot_timer.stop()
+        for deck_id in self._changed_decks:
+            bar_info = self._bar_info.get(deck_id)
+            if bar_info is not None:  # Evicted ones were written already
+                self._store.save_bar_state(
+                    deck_id, Snapshot(bar_info.current_value, bar_info.history.to_bytes()))
+        self._changed_decks.clear()
+        self._store.flush()
+
+    def reset_bars(self) -> None:
+        """Writes the life bars and drops them from memory.
+
+        Each deck's life bar is read again from the state store the next time
+        the deck is used.
+        """
+        self.save_snapshots()
+        self._bar_info.clear()
+        self._cur_deck_id = None
+
+    def start_timer(self) -> None:
+        """Starts the drain timer, counting elapsed time from now."""
+        self._last_tick = time.monotonic_ns()
+        self.timer.start(TIMER_INTERVAL)
 
     def hide_life_bar(self) -> None:
         """Set life bar visibility to False."""
         self._progress_bar.set_visible(visible=False)
 
-    def get_current_life(self) -> Union[int, float]:
-        """Get the current deck's current life."""
+    def get_current_life(self) -> float:
+        """Get the current deck's current life, in seconds."""
         self._cur_deck_id = self._get_cur_deck_id()
-        if self._cur_deck_id not in self._bar_info:
-            self._add_deck(self._cur_deck_id)
-        return self._bar_info[self._cur_deck_id]['currentValue']
+        return to_seconds(self._get_bar_info(self._cur_deck_id).current_value)
 
     def set_deck_conf(self, conf: dict[str, Any], *, update_life: bool) -> None:
         """Updates a deck's current settings and state.
@@ -79,87 +143,97 @@ class DeckManager:
             conf: The deck's configuration and state.
             update_life: Update the current life?
         """
-        if conf['id'] not in self._bar_info:
-            self._add_deck(conf['id'])
-
-        bar_info = self._bar_info[conf['id']]
-        bar_info['enable'] = conf['enable']
-        bar_info['maxValue'] = conf['maxLife']
-        bar_info['recoverValue'] = conf['recover']
-        bar_info['fullRecoverSpeed'] = conf['fullRecoverSpeed']
-        bar_info['damageValue'] = conf['damage']
-        bar_info['damageNew'] = conf['damageNew']
-        bar_info['damageLearning'] = conf['damageLearning']
+        bar_info = self._get_bar_info(conf['id'])
+        bar_info.apply_conf(conf)
 
         if update_life:
-            bar_info['currentValue'] = min(
-                conf.get('currentValue', conf['maxLife']),
-                conf['maxLife'],
+            life = bar_info.current_value
+            bar_info.current_value = min(
+                to_life(conf.get('currentValue', conf['maxLife'])),
+                bar_info.max_value,
             )
+            self.event_log.append(
+                SET, conf['id'], bar_info.current_value - life, bar_info.current_value)
+            self._mark_changed(conf['id'])
 
     @must_have_active_deck
-    def life_timer(self, bar_info: dict[str, Any]) -> None:
-        """Life loss due to drain, or life gained due to recover."""
-        if self.recovering:
-            if bar_info['fullRecoverSpeed'] == 0:
-                self.recover()
-            else:
-                self._update_life(bar_info, bar_info['fullRecoverSpeed'] / 10)
+    def life_timer(self, bar_info: BarState) -> None:
+        """Life loss due to drain, or life gained due to recover.
+
+        The amount is given by the time elapsed since the previous tick, so late
+        or merged timer ticks do not slow down the drain. Only whole milliseconds
+        are consumed, and the remainder is carried to the next tick. The timer is
+        single shot, and is armed again for when the bar is expected to look
+        different.
+
+        Stalls of the user interface (e.g. a sync or a media check) are drained
+        in full once the timer runs again. The monotonic clock does not advance
+        during a system suspend on Linux and macOS, but does on Windows, so gaps
+        longer than MAX_TICK_ELAPSED are taken as a suspend and drain only up to
+        that limit.
+        """
+        now = time.monotonic_ns()
+        elapsed = (now - self._last_tick) // 1_000_000
+        if elapsed > MAX_TICK_ELAPSED:
+            elapsed = MAX_TICK_ELAPSED
+            self._last_tick = now
         else:
-            self._update_life(bar_info, -0.1)  # Drain
+            self._last_tick += elapsed * 1_000_000
 
-        if bar_info['currentValue'] in [0, bar_info['maxValue']]:
+        if self.recovering and bar_info.full_recover_speed == 0:
+            self.recover()
+            stop = True
+        else:
+            life = bar_info.current_value
+            stop = self._core.tick(bar_info, elapsed, recovering=self.recovering)
+            self._life_changed(RECOVER if self.recovering else DRAIN, bar_info, life)
+
+        if stop:
             self.timer.stop()
+        else:
+            self._schedule_tick(bar_info)
 
     @must_have_active_deck
-    def heal(self, bar_info: dict[str, Any], value:Optional[Union[int, float]]=None, *,
+    def heal(self, bar_info: BarState, value:Optional[float]=None, *,
              increment:bool=True) -> None:
         """Partially heal life of the currently active deck.
 
         Args:
             bar_info: The currently active deck's life bar information.
-            value: Optional. The value used to increment or decrement.
+            value: Optional. The value used to increment or decrement, in
+                seconds. The deck's recover value if not given.
             increment: Optional. A flag that indicates increment or decrement.
         """
-        multiplier = 1 if increment else -1
-        if value is None:
-            value = int(bar_info['recoverValue'])
-        self._update_life(bar_info, multiplier * value)
+        life = bar_info.current_value
+        self._core.heal(
+            bar_info, None if value is None else to_life(value), increment=increment)
+        self._life_changed(HEAL, bar_info, life)
 
     @must_have_active_deck
-    def recover(self, bar_info: dict[str, Any]) -> None:
+    def recover(self, bar_info: BarState) -> None:
         """Resets the life bar of the currently active deck to the initial value.
 
         Args:
             bar_info: The currently active deck's life bar information.
         """
-        conf = self._global_conf.get()
-        start_empty = conf['startEmpty']
-        if not conf['shareDrain']:
-            conf = self._deck_conf.get()
-
-        life = 0 if start_empty else conf['maxLife']
-        bar_info['currentValue'] = life
-        self._progress_bar.set_current_value(life)
-        self._game_over = start_empty
+        life = bar_info.current_value
+        self._core.reset(bar_info, start_empty=self._global_conf.get()['startEmpty'])
+        self._life_changed(RESET, bar_info, life)
 
     @must_have_active_deck
-    def damage(self, bar_info: dict[str, Any], card_type: CardType) -> None:
-        """Apply damage.
+    def damage(self, bar_info: BarState, card_type: CardType) -> None:
+        """Apply the damage of answering Again.
 
         Args:
             bar_info: The currently active deck's life bar information.
-            card_type: Applies different damage depending on card type.
+            card_type: The card type. Each card type may have a different damage.
         """
-        damage = bar_info['damageValue']
-        if card_type == 0:
-            damage = bar_info['damageNew']
-        elif card_type == 1:
-            damage = bar_info['damageLearning']
-        self._update_life(bar_info, -1 * damage)
+        life = bar_info.current_value
+        self._core.damage(bar_info, card_type)
+        self._life_changed(DAMAGE, bar_info, life)
 
     @must_have_active_deck
-    def answer(self, bar_info: dict[str, Any], review_response: Literal[1, 2, 3, 4],
+    def answer(self, bar_info: BarState, review_response: Literal[1, 2, 3, 4],
                card_type: CardType) -> None:
         """Restores or drains life after an answer.
 
@@ -168,92 +242,127 @@ class DeckManager:
             review_response: The response given by the user.
             card_type: The card type of the answered card.
         """
-        if review_response == 1 and bar_info['damageValue'] is not None:
-            self.damage(card_type=card_type)
-        else:
-            self.heal()
-        self._next(bar_info)
+        life = bar_info.current_value
+        self._core.answer(bar_info, review_response, card_type)
+        self._life_changed(ANSWER, bar_info, life)
 
     @must_have_active_deck
-    def action(self, bar_info: dict[str, Any], behavior_index: Literal[0, 1, 2]) -> None:
+    def action(self, bar_info: BarState, behavior_index: Literal[0, 1, 2]) -> None:
         """Bury/suspend handling."""
-        if behavior_index == BEHAVIORS.index('Drain life'):
-            self.heal(increment=False)
-        elif behavior_index == BEHAVIORS.index('Recover life'):
-            self.heal(increment=True)
-        self._next(bar_info)
+        life = bar_info.current_value
+        self._core.action(bar_info, behavior_index)
+        self._life_changed(ACTION, bar_info, life)
 
     @must_have_active_deck
-    def undo(self, bar_info: dict[str, Any]) -> None:
+    def undo(self, bar_info: BarState) -> None:
         """Restore the life to how it was in the previous card.
 
         Args:
             bar_info: The currently active deck's life bar information.
         """
-        history = bar_info['history']
-        if bar_info['currentReview'] == 0:
-            return
-        bar_info['currentReview'] -= 1
-        bar_info['currentValue'] = history[bar_info['currentReview']]
-        self._progress_bar.set_current_value(bar_info['currentValue'])
+        life = bar_info.current_value
+        if self._core.undo(bar_info):
+            self._life_changed(UNDO, bar_info, life)
 
-    def _update_life(self, bar_info: dict[str, Any], difference: float) -> None:
-        """Apply recover/damage/drain.
+    def _life_changed(self, event: int, bar_info: BarState, previous_life: int) -> None:
+        """Shows the new life of the current deck, and logs the change.
 
         Args:
+            event: The cause of the change, an index of event_log.EVENTS.
             bar_info: The currently active deck's life bar information.
-            difference: The amount to increase or decrease.
+            previous_life: The life before the change.
+        """
+        life = bar_info.current_value
+        self._progress_bar.set_current_value(life)
+        self.event_log.append(event, self._cur_deck_id, life - previous_life, life)
+        self._mark_changed(self._cur_deck_id)
+
+    def _mark_changed(self, deck_id: str) -> None:
+        """Schedules a snapshot of a deck's life bar, unless one is scheduled already.
+
+        Args:
+            deck_id: The ID of the deck.
         """
-        self._progress_bar.inc_current_value(difference)
-        life = self._progress_bar.get_current_value()
-        bar_info['currentValue'] = life
-        if life > 0:
-            self._game_over = False
-        elif not self._game_over:
-            self._game_over = True
-            runHook('LifeDrain.gameOver')
-
-    def _next(self, bar_info: dict[str, Any]) -> None:
-        """Remembers the current life and advances to the next card.
+        if deck_id in self._changed_decks:
+            return
+        if not self._changed_decks:
+            self._snapshot_timer.start(SNAPSHOT_DELAY)
+        self._changed_decks.add(deck_id)
+
+    def _schedule_tick(self, bar_info: BarState) -> None:
+        """Arms the timer for the next visible change of the life bar.
 
         Args:
             bar_info: The currently active deck's life bar information.
         """
-        bar_info['currentReview'] += 1
-        history = bar_info['history']
-        if len(history) == bar_info['currentReview']:
-            history.append(bar_info['currentValue'])
+        rate = bar_info.full_recover_speed if self.recovering else -LIFE_SCALE
+        self._progress_bar.set_rate(rate)
+        interval = self._progress_bar.time_to_next_change(rate)
+        if interval is None:
+            interval = MAX_TIMER_INTERVAL
         else:
-            history[bar_info['currentReview']] = bar_info['currentValue']
+            interval = min(max(interval, TIMER_INTERVAL), MAX_TIMER_INTERVAL)
+        self.timer.start(interval)
 
     def _get_cur_deck_id(self) -> str:
         """Gets the currently selected deck id."""
         return 'shared' if self._global_conf.get()['shareDrain'] else self._deck_conf.get()['id']
 
-    def _add_deck(self, deck_id:str) -> None:
+    def _get_cur_conf(self) -> Mapping[str, Any]:
+        """Gets the configuration of the current life bar."""
+        conf = self._global_conf.get()
+        return conf if conf['shareDrain'] else self._deck_conf.get()
+
+    def _get_bar_info(self, deck_id: str) -> BarState:
+        """Gets a deck's life bar, marking it as the most recently used.
+
+        Args:
+            deck_id: The ID of the deck.
+        """
+        bar_info = self._bar_info.get(deck_id)
+        if bar_info is None:
+            return self._add_deck(deck_id)
+        self._bar_info.move_to_end(deck_id)
+        return bar_info
+
+    def _add_deck(self, deck_id:str) -> BarState:
         """Adds a deck to the list of decks that are being managed.
 
+        The life bar is restored from the state store if it was evicted before.
+
         Args:
             deck_id: The ID of the deck.
         """
-        conf = self._global_conf.get()
-        start_empty = conf['startEmpty']
-        if not conf['shareDrain']:
-            conf = self._deck_conf.get()
-
-        self._bar_info[deck_id] = {
-            'enable': conf['enable'],
-            'maxValue': conf['maxLife'],
-            'recoverValue': conf['recover'],
-            'fullRecoverSpeed': conf['fullRecoverSpeed'],
-            'damageValue': conf['damage'],
-            'damageNew': conf['damageNew'],
-            'damageLearning': conf['damageLearning'],
-            'history': [conf['maxLife']],
-            'currentReview': 0,
-        }
-        self._bar_info[deck_id]['currentValue'] = 0 if start_empty else conf['maxLife']
-        self._game_over = start_empty
+        global_conf = self._global_conf.get()
+        start_empty = global_conf['startEmpty']
+        undo_depth = global_conf['undoDepth']
+        conf = self._get_cur_conf()
+
+        snapshot = self._store.load_bar_state(deck_id)
+        if snapshot is None:
+            bar_info = self._core.new_state(conf, undo_depth, start_empty=start_empty)
+        else:
+            bar_info = BarState(conf, snapshot.life, undo_depth)
+            bar_info.current_value = min(bar_info.current_value, bar_info.max_value)
+            self._core.game_over = bar_info.current_value == 0
+            bar_info.history = LifeHistory.from_bytes(undo_depth, snapshot.history)
+        self._bar_info[deck_id] = bar_info
+        self._evict()
+        return bar_info
+
+    def _evict(self) -> None:
+        """Moves the least recently used life bars to the state store.
+
+        The current deck's life bar is always kept in memory.
+        """
+        while len(self._bar_info) > MAX_CACHED_DECKS:
+            deck_id, bar_info = self._bar_info.popitem(last=False)
+            if deck_id == self._cur_deck_id:
+                self._bar_info[deck_id] = bar_info
+                continue
+            self._store.save_bar_state(
+                deck_id, Snapshot(bar_info.current_value, bar_info.history.to_bytes()))
+            self._changed_decks.discard(deck_id)
 
     def _update_progress_bar_style(self) -> None:
         """Synchronizes the Progress Bar styling with the Global Settings."""
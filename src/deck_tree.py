@@ -0,0 +1,75 @@
+# Copyright (c) Yutsuten <https://github.com/Yutsuten>. Licensed under AGPL-3.0.
+# See the LICENCE file in the repository root for full licence text.
+
+from __future__ import annotations
+
+from typing import Iterable, Iterator, Optional
+
+SEPARATOR = '::'  # Between the names of a deck and its subdecks
+
+
+class DeckTree:
+    """Index of the parent and children of each deck, built from the deck names.
+
+    Anki names subdecks after their parent, e.g. `Japanese::Vocab`. The index
+    is updated incrementally: only the decks that were added, renamed or
+    removed since the previous update are indexed again.
+    """
+
+    def __init__(self) -> None:
+        self._names: dict[int, str] = {}
+        self._ids: dict[str, int] = {}
+        self._parents: dict[int, Optional[int]] = {}
+        self._children: dict[int, set[int]] = {}
+
+    def __len__(self) -> int:
+        """The number of indexed decks."""
+        return len(self._names)
+
+    def update(self, decks: Iterable[tuple[str, int]]) -> set[int]:
+        """Synchronizes the index with the decks of the collection.
+
+        Args:
+            decks: The name and ID of every deck.
+
+        Returns:
+            The IDs of the decks that were added, renamed or removed.
+        """
+        names = {deck_id: name for name, deck_id in decks}
+        changed = {deck_id for deck_id in self._names if deck_id not in names}
+        changed.update(
+            deck_id for deck_id, name in names.items() if self._names.get(deck_id) != name)
+
+        for deck_id in changed:
+            self._remove(deck_id)
+        added = [deck_id for deck_id in changed if deck_id in names]
+        for deck_id in added:
+            self._names[deck_id] = names[deck_id]
+            self._ids[names[deck_id]] = deck_id
+        for deck_id in added:
+            parent = self._ids.get(names[deck_id].rpartition(SEPARATOR)[0])
+            self._parents[deck_id] = parent
+            if parent is not None:
+                self._children.setdefault(parent, set()).add(deck_id)
+        return changed
+
+    def parent(self, deck_id: int) -> Optional[int]:
+        """Gets the ID of a deck's parent. None for top level and unknown decks."""
+        return self._parents.get(deck_id)
+
+    def descendants(self, deck_id: int) -> Iterator[int]:
+        """Gets the IDs of the subdecks of a deck, at any depth."""
+        pending = list(self._children.get(deck_id, ()))
+        while pending:
+            child = pending.pop()
+            yield child
+            pending.extend(self._children.get(child, ()))
+
+    def _remove(self, deck_id: int) -> None:
+        """Removes a deck from the index, keeping the links to its children."""
+        name = self._names.pop(deck_id, None)
+        if name is not None and self._ids.get(name) == deck_id:
+            del self._ids[name]
+        parent = self._parents.pop(deck_id, None)
+        if parent is not None:
+            self._children[parent].discard(deck_id)
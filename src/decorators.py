@@ -23,7 +23,7 @@ def must_have_active_deck(func: Callable) -> Callable:
         if self._cur_deck_id is None:
             raise NoDeckSelectedError
         bar_info = self._bar_info[self._cur_deck_id]
-        if not bar_info['enable']:
+        if not bar_info.enable:
             return lambda: None
         return func(self, bar_info, *args, **kwargs)
     return _wrapper
@@ -29,6 +29,7 @@ DEFAULTS = {
     'damage': None,
     'damageNew': None,
     'damageLearning': None,
+    'answerMatrix': None,
     'barPosition': POSITION_OPTIONS.index('Bottom'),
     'barHeight': 15,
     'barFgColor': '#489ef6',
@@ -54,5 +55,7 @@ DEFAULTS = {
     'behavUndo': BEHAVIORS.index('Do nothing'),
     'behavBury': BEHAVIORS.index('Do nothing'),
     'behavSuspend': BEHAVIORS.index('Do nothing'),
+    'undoDepth': 100,
+    'enableDiagnostics': False,
     'shareDrain': False,
 }
@@ -0,0 +1,115 @@
+# Copyright (c) Yutsuten <https://github.com/Yutsuten>. Licensed under AGPL-3.0.
+# See the LICENCE file in the repository root for full licence text.
+
+from __future__ import annotations
+
+import functools
+import time
+from array import array
+from typing import Any, Callable, TypeVar
+
+BUCKETS = 24  # Bucket i holds latencies below 2**i microseconds, the last one the rest
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+
+class LatencyStats:
+    """Call count and latency histogram of a single callback.
+
+    Latencies are counted in buckets of powers of two microseconds, so the
+    memory used does not grow with the number of calls.
+    """
+    __slots__ = ('buckets', 'count', 'max_ns', 'total_ns')
+
+    def __init__(self) -> None:
+        self.buckets = array('Q', bytes(8 * BUCKETS))
+        self.count = 0
+        self.max_ns = 0
+        self.total_ns = 0
+
+    def record(self, elapsed_ns: int) -> None:
+        """Adds a call that took `elapsed_ns` nanoseconds."""
+        self.buckets[min((elapsed_ns // 1000).bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.total_ns += elapsed_ns
+        self.max_ns = max(self.max_ns, elapsed_ns)
+
+    def percentile(self, fraction: float) -> int:
+        """Estimates a percentile of the latency, in nanoseconds.
+
+        The result is the upper bound of the bucket holding the percentile,
+        limited by the maximum latency seen.
+        """
+        target = fraction * self.count
+        seen = 0
+        for index, amount in enumerate(self.buckets):
+            seen += amount
+            if amount and seen >= target:
+                return min(1000 * 2 ** index, self.max_ns)
+        return self.max_ns
+
+    def reset(self) -> None:
+        """Forgets all calls."""
+        self.buckets = array('Q', bytes(8 * BUCKETS))
+        self.count = 0
+        self.max_ns = 0
+        self.total_ns = 0
+
+
+class Diagnostics:
+    """Measures how long Life Drain's callbacks take to run.
+
+    Callbacks given to Anki are wrapped with `wrap`. While disabled, a wrapped
+    callback only pays for checking the `enabled` flag.
+
+    Attributes:
+        enabled: Are the callbacks being measured?
+    """
+
+    def __init__(self) -> None:
+        self.enabled: bool = False
+        self._stats: dict[str, LatencyStats] = {}
+
+    def wrap(self, name: str, func: F) -> F:
+        """Wraps a callback so that its calls are measured.
+
+        Args:
+            name: The name shown in the report. Callbacks sharing a name share
+                their statistics.
+            func: The callback.
+        """
+        stats = self._stats.setdefault(name, LatencyStats())
+        clock = time.perf_counter_ns
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs) -> Any:
+            if not self.enabled:
+                return func(*args, **kwargs)
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.record(clock() - start)
+
+        return wrapper  # type: ignore[return-value]
+
+    def report(self) -> list[dict[str, Any]]:
+        """Gets the statistics of each callback, slowest first.
+
+        Latencies are in milliseconds.
+        """
+        rows = [{
+            'name': name,
+            'count': stats.count,
+            'total': stats.total_ns / 1e6,
+            'p50': stats.percentile(0.5) / 1e6,
+            'p95': stats.percentile(0.95) / 1e6,
+            'max': stats.max_ns / 1e6,
+        } for name, stats in self._stats.items()]
+        rows.sort(key=lambda row: row['total'], reverse=True)
+        return rows
+
+    def reset(self) -> None:
+        """Forgets all measured calls."""
+        for stats in self._stats.values():
+            stats.reset()
@@ -0,0 +1,163 @@
+# Copyright (c) Yutsuten <https://github.com/Yutsuten>. Licensed under AGPL-3.0.
+# See the LICENCE file in the repository root for full licence text.
+
+from __future__ import annotations
+
+from typing import Any, Callable, Literal, Mapping, Optional
+
+from .bar_state import EASES, LIFE_SCALE, BarState, to_life
+from .defaults import BEHAVIORS
+
+DRAIN_LIFE = BEHAVIORS.index('Drain life')
+RECOVER_LIFE = BEHAVIORS.index('Recover life')
+ANSWER_EASES = len(EASES)
+
+
+class DrainCore:
+    """The rules of Life Drain: drain, heal, damage, undo and game over.
+
+    Works only with BarState objects and plain values, so it does not depend on
+    Anki or Qt. Life values are in LIFE_SCALE units, and time in milliseconds.
+
+    Attributes:
+        game_over: Is the life of the current deck at zero?
+    """
+
+    def __init__(self, on_game_over: Optional[Callable[[], Any]]=None):
+        """Initializes the game state.
+
+        Args:
+            on_game_over: Optional. Called whenever the life reaches zero.
+        """
+        self.game_over: bool = False
+        self._on_game_over = on_game_over
+
+    def new_state(self, conf: Mapping[str, Any], undo_depth: int, *,
+                  start_empty: bool) -> BarState:
+        """Creates the life bar of a deck that was not reviewed yet.
+
+        Args:
+            conf: The deck's configuration.
+            undo_depth: How many reviews can be undone.
+            start_empty: Start with zero life instead of full.
+        """
+        life = 0 if start_empty else to_life(conf['maxLife'])
+        self.game_over = start_empty
+        return BarState(conf, life, undo_depth)
+
+    def tick(self, state: BarState, elapsed: int, *, recovering: bool=False) -> bool:
+        """Drains life, or recovers it at the full recover speed.
+
+        Args:
+            state: The life bar.
+            elapsed: Time since the previous tick, in milliseconds.
+            recovering: Recover life instead of draining it.
+
+        Returns:
+            True if the life reached zero or the maximum, so ticking may stop.
+        """
+        rate = state.full_recover_speed if recovering else -LIFE_SCALE
+        self.change_life(state, rate * elapsed // 1000)
+        return state.current_value in (0, state.max_value)
+
+    def heal(self, state: BarState, value: Optional[int]=None, *, increment: bool=True) -> None:
+        """Partially heals life.
+
+        Args:
+            state: The life bar.
+            value: Optional. The value used to increment or decrement.
+            increment: Optional. A flag that indicates increment or decrement.
+        """
+        if value is None:
+            value = state.recover_value
+        self.change_life(state, value if increment else -value)
+
+    def damage(self, state: BarState, card_type: int) -> None:
+        """Applies the damage of answering Again, if it damages.
+
+        Args:
+            state: The life bar.
+            card_type: The card type (as Card.type) of the answered card.
+        """
+        self.change_life(state, min(state.answer_table[card_type * ANSWER_EASES], 0))
+
+    def answer(self, state: BarState, review_response: Literal[1, 2, 3, 4],
+               card_type: int) -> None:
+        """Restores or drains life after an answer, and advances to the next card.
+
+        The life change is read from the deck's answer table.
+
+        Args:
+            state: The life bar.
+            review_response: The response given by the user.
+            card_type: The card type (as Card.type) of the answered card.
+        """
+        self.change_life(
+            state, state.answer_table[card_type * ANSWER_EASES + review_response - 1])
+        self.next(state)
+
+    def action(self, state: BarState, behavior_index: int) -> None:
+        """Applies the behavior of bury/suspend/delete, and advances to the next card.
+
+        Args:
+            state: The life bar.
+            behavior_index: An index of BEHAVIORS.
+        """
+        if behavior_index == DRAIN_LIFE:
+            self.heal(state, increment=False)
+        elif behavior_index == RECOVER_LIFE:
+            self.heal(state, increment=True)
+        self.next(state)
+
+    def undo(self, state: BarState) -> bool:
+        """Restores the life to how it was in the previous card.
+
+        Args:
+            state: The life bar.
+
+        Returns:
+            False if there was nothing to undo.
+        """
+        life = state.history.pop()
+        if life is None:
+            return False
+        state.current_value = life
+        return True
+
+    def reset(self, state: BarState, *, start_empty: bool) -> None:
+        """Resets the life to the initial value.
+
+        Args:
+            state: The life bar.
+            start_empty: Reset to zero instead of the maximum.
+        """
+        state.current_value = 0 if start_empty else state.max_value
+        self.game_over = start_empty
+
+    def next(self, state: BarState) -> None:
+        """Remembers the current life and advances to the next card.
+
+        Args:
+            state: The life bar.
+        """
+        state.history.push(state.current_value)
+
+    def change_life(self, state: BarState, difference: int) -> None:
+        """Applies recover/damage/drain, keeping the life between zero and the maximum.
+
+        Args:
+            state: The life bar.
+            difference: The amount to increase or decrease.
+        """
+        life = state.current_value + difference
+        if life > state.max_value:
+            life = state.max_value
+        elif life < 0:
+            life = 0
+        state.current_value = life
+        if life > 0:
+            self.game_over = False
+        elif not self.game_over:
+            self.game_over = True
+            if self._on_game_over is not None:
+                self._on_game_over()
@@ -0,0 +1,187 @@
+# Copyright (c) Yutsuten <https://github.com/Yutsuten>. Licensed under AGPL-3.0.
+# See the LICENCE file in the repository root for full licence text.
+
+from __future__ import annotations
+
+import mmap
+import struct
+import time
+from typing import TYPE_CHECKING, BinaryIO, Iterator, NamedTuple, Optional, Union
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+EVENT_LOG_FILE = 'lifedrain_events.bin'
+EVENTS = ('drain', 'recover', 'heal', 'damage', 'answer', 'action', 'undo', 'reset', 'set')
+DRAIN, RECOVER, HEAL, DAMAGE, ANSWER, ACTION, UNDO, RESET, SET = range(len(EVENTS))
+COALESCED_EVENTS = (DRAIN, RECOVER)
+SHARED_DECK_ID = 0  # Stands for the life shared by all decks
+
+# Timestamp (ms since epoch), deck ID, life difference, resulting life, event type
+RECORD = struct.Struct('<qqiiB3x')
+BATCH_SIZE = 256  # Records kept in memory before writing them
+COALESCE_GAP = 1000  # Milliseconds. Drain ticks further apart start a new record
+
+
+class LifeEvent(NamedTuple):
+    """A change of life, as stored in the event log."""
+    timestamp: int
+    deck_id: int
+    delta: int
+    life: int
+    event: int
+
+
+class EventLog:
+    """Append-only log of the life changes of each deck.
+
+    Records have a fixed width, and are written to a file in the profile folder
+    in batches. Consecutive timer ticks of the same deck are merged into a single
+    record, so the log grows with the reviews and not with the time spent
+    reviewing. Life values are in LIFE_SCALE units.
+    """
+
+    def __init__(self) -> None:
+        self._path: Optional[Path] = None
+        self._file: Optional[BinaryIO] = None
+        self._buffer = bytearray()
+        self._pending: Optional[list[int]] = None
+        self._last_timestamp = 0
+
+    @property
+    def path(self) -> Optional[Path]:
+        """The log file of the open profile."""
+        return self._path
+
+    def open(self, path: Path) -> None:
+        """Starts logging into a file, closing the previous one.
+
+        A record partially written (e.g. if Anki crashed) is discarded.
+
+        Args:
+            path: The log file.
+        """
+        self.close()
+        if path.exists():
+            size = path.stat().st_size
+            if size % RECORD.size:
+                with path.open('r+b') as log_file:
+                    log_file.truncate(size - size % RECORD.size)
+            if size >= RECORD.size:
+                self._last_timestamp = self._read_timestamp(path, size // RECORD.size - 1)
+        self._file = path.open('ab')
+        self._path = path
+
+    def close(self) -> None:
+        """Writes the pending records and closes the file."""
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+        self._path = None
+        self._last_timestamp = 0
+
+    def append(self, event: int, deck_id: Union[int, str], delta: int, life: int) -> None:
+        """Logs a change of life. Does nothing if no file is open.
+
+        Args:
+            event: An index of EVENTS.
+            deck_id: The deck's ID, or 'shared'.
+            delta: The difference of life.
+            life: The resulting life.
+        """
+        if self._file is None:
+            return
+        timestamp = max(time.time_ns() // 1_000_000, self._last_timestamp)
+        self._last_timestamp = timestamp
+        deck = SHARED_DECK_ID if deck_id == 'shared' else int(deck_id)
+
+        pending = self._pending
+        if pending is not None:
+            if (event == pending[4] and deck == pending[1]
+                    and timestamp - pending[0] <= COALESCE_GAP):
+                pending[0] = timestamp
+                pending[2] += delta
+                pending[3] = life
+                return
+            self._buffer += RECORD.pack(*pending)
+            self._pending = None
+
+        if event in COALESCED_EVENTS:
+            self._pending = [timestamp, deck, delta, life, event]
+            return
+        self._buffer += RECORD.pack(timestamp, deck, delta, life, event)
+        if len(self._buffer) >= BATCH_SIZE * RECORD.size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes the records kept in memory into the file."""
+        if self._file is None:
+            return
+        if self._pending is not None:
+            self._buffer += RECORD.pack(*self._pending)
+            self._pending = None
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._file.flush()
+            self._buffer.clear()
+
+    def __len__(self) -> int:
+        """The number of records in the file."""
+        if self._path is None:
+            return 0
+        self.flush()
+        return self._path.stat().st_size // RECORD.size
+
+    def records(self, start: int=0, stop: Optional[int]=None) -> Iterator[LifeEvent]:
+        """Reads the records of the open file, oldest first.
+
+        Args:
+            start: Optional. The index of the first record.
+            stop: Optional. The index after the last record.
+        """
+        if self._path is None:
+            return iter(())
+        self.flush()
+        return read_records(self._path, start, stop)
+
+    def replay(self, deck_id: Union[int, str]) -> Iterator[tuple[int, int]]:
+        """Rebuilds the life curve of a deck.
+
+        Args:
+            deck_id: The deck's ID, or 'shared'.
+
+        Yields:
+            The timestamp (milliseconds since epoch) and the life after each change.
+        """
+        deck = SHARED_DECK_ID if deck_id == 'shared' else int(deck_id)
+        for record in self.records():
+            if record.deck_id == deck:
+                yield record.timestamp, record.life
+
+    @staticmethod
+    def _read_timestamp(path: Path, index: int) -> int:
+        """Reads the timestamp of a record directly from a file."""
+        with path.open('rb') as log_file:
+            log_file.seek(index * RECORD.size)
+            return RECORD.unpack(log_file.read(RECORD.size))[0]
+
+
+def read_records(path: Path, start: int=0, stop: Optional[int]=None) -> Iterator[LifeEvent]:
+    """Reads the records of an event log file through a memory map, oldest first.
+
+    Args:
+        path: The log file.
+        start: Optional. The index of the first record.
+        stop: Optional. The index after the last record.
+    """
+    with path.open('rb') as log_file:
+        count = path.stat().st_size // RECORD.size
+        stop = count if stop is None else min(stop, count)
+        if start >= stop:
+            return
+        with mmap.mmap(log_file.fileno(), count * RECORD.size, access=mmap.ACCESS_READ) as mapped:
+            unpack_from = RECORD.unpack_from
+            for index in range(start, stop):
+                yield LifeEvent(*unpack_from(mapped, index * RECORD.size))
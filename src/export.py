@@ -0,0 +1,193 @@
+# Copyright (c) Yutsuten <https://github.com/Yutsuten>. Licensed under AGPL-3.0.
+# See the LICENCE file in the repository root for full licence text.
+
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+from .bar_state import LIFE_SCALE
+from .event_log import EVENTS, RECORD, LifeEvent
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+INDEX_SUFFIX = '.idx'
+INDEX_ENTRY = struct.Struct('<Iq')  # Block number, deck ID
+BLOCK_SIZE = 1024  # Records per index block
+CSV_HEADER = 'timestamp,time,deck_id,event,delta,life'
+
+
+class _Timestamps:
+    """Read-only sequence of the timestamps of a memory mapped event log."""
+
+    def __init__(self, mapped: mmap.mmap, count: int):
+        self._mapped = mapped
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> int:
+        return RECORD.unpack_from(self._mapped, index * RECORD.size)[0]
+
+
+class EventIndex:
+    """Sidecar index of the decks present in each block of an event log.
+
+    The index is a file of (block number, deck ID) entries, sorted by block,
+    next to the log. Like the log it is append-only: only blocks filled since
+    the last update are read. The last, incomplete block is never indexed.
+    """
+
+    def __init__(self, log_path: Path):
+        self.path = log_path.with_name(log_path.name + INDEX_SUFFIX)
+
+    def indexed_blocks(self) -> int:
+        """Gets how many blocks of the log are indexed.
+
+        A partially written entry (e.g. if Anki crashed) is discarded.
+        """
+        if not self.path.exists():
+            return 0
+        size = self.path.stat().st_size
+        if size % INDEX_ENTRY.size:
+            with self.path.open('r+b') as index_file:
+                index_file.truncate(size - size % INDEX_ENTRY.size)
+            size -= size % INDEX_ENTRY.size
+        if size == 0:
+            return 0
+        with self.path.open('rb') as index_file:
+            index_file.seek(size - INDEX_ENTRY.size)
+            return INDEX_ENTRY.unpack(index_file.read(INDEX_ENTRY.size))[0] + 1
+
+    def update(self, mapped: mmap.mmap, count: int) -> int:
+        """Indexes the blocks filled since the last update.
+
+        Args:
+            mapped: The memory mapped event log.
+            count: The number of records in the log.
+
+        Returns:
+            The number of indexed blocks.
+        """
+        first = self.indexed_blocks()
+        last = count // BLOCK_SIZE
+        if first >= last:
+            return first
+        with self.path.open('ab') as index_file:
+            for block in range(first, last):
+                decks = {
+                    RECORD.unpack_from(mapped, index * RECORD.size)[1]
+                    for index in range(block * BLOCK_SIZE, (block + 1) * BLOCK_SIZE)
+                }
+                index_file.write(b''.join(INDEX_ENTRY.pack(block, deck) for deck in sorted(decks)))
+        return last
+
+    def blocks(self, deck_id: int) -> Iterator[int]:
+        """Gets the indexed blocks that have records of a deck, in order."""
+        if not self.path.exists():
+            return
+        chunk_size = INDEX_ENTRY.size * 4096
+        with self.path.open('rb') as index_file:
+            while chunk := index_file.read(chunk_size):
+                for block, deck in INDEX_ENTRY.iter_unpack(chunk):
+                    if deck == deck_id:
+                        yield block
+
+
+def select(log_path: Path, deck_id: Optional[int]=None, start: Optional[int]=None,
+           end: Optional[int]=None) -> Iterator[LifeEvent]:
+    """Reads the records of an event log, filtered by deck and time.
+
+    The time range is found by binary search on the timestamps, which the log
+    keeps in order, and the deck's records through an EventIndex. Records are
+    read one at a time from a memory map, so memory use does not depend on the
+    size of the log.
+
+    Args:
+        log_path: The event log file.
+        deck_id: Optional. Only the records of this deck. The life shared by all
+            decks is stored as deck 0.
+        start: Optional. Only records at or after this timestamp, in
+            milliseconds since epoch.
+        end: Optional. Only records before this timestamp.
+    """
+    if not log_path.exists():
+        return
+    with log_path.open('rb') as log_file:
+        count = log_path.stat().st_size // RECORD.size
+        if count == 0:
+            return
+        with mmap.mmap(log_file.fileno(), count * RECORD.size, access=mmap.ACCESS_READ) as mapped:
+            timestamps = _Timestamps(mapped, count)
+            first = 0 if start is None else bisect_left(timestamps, start)
+            last = count if end is None else bisect_left(timestamps, end)
+            if deck_id is None:
+                ranges: Iterator[tuple[int, int]] = iter([(first, last)])
+            else:
+                event_index = EventIndex(log_path)
+                indexed = event_index.update(mapped, count)
+                ranges = _deck_ranges(event_index, indexed, deck_id, first, last)
+
+            unpack_from = RECORD.unpack_from
+            for range_start, range_end in ranges:
+                for index in range(range_start, range_end):
+                    record = LifeEvent(*unpack_from(mapped, index * RECORD.size))
+                    if deck_id is None or record.deck_id == deck_id:
+                        yield record
+
+
+def _deck_ranges(index: EventIndex, indexed: int, deck_id: int, first: int,
+                 last: int) -> Iterator[tuple[int, int]]:
+    """Gets the ranges of records between first and last that may belong to a deck.
+
+    Args:
+        index: The index of the event log.
+        indexed: The number of indexed blocks. Records after them are not indexed.
+        deck_id: The deck's ID.
+        first: The index of the first record.
+        last: The index after the last record.
+    """
+    for block in index.blocks(deck_id):
+        block_start = max(block * BLOCK_SIZE, first)
+        block_end = min((block + 1) * BLOCK_SIZE, last)
+        if block_start < block_end:
+            yield block_start, block_end
+    tail_start = max(indexed * BLOCK_SIZE, first)
+    if tail_start < last:
+        yield tail_start, last
+
+
+def _fields(record: LifeEvent) -> dict[str, Any]:
+    """Converts a record to exported values. Life is in seconds."""
+    return {
+        'timestamp': record.timestamp,
+        'time': datetime.fromtimestamp(record.timestamp / 1000, tz=timezone.utc).isoformat(),
+        'deck_id': record.deck_id,
+        'event': EVENTS[record.event],
+        'delta': record.delta / LIFE_SCALE,
+        'life': record.life / LIFE_SCALE,
+    }
+
+
+def to_csv(records: Iterator[LifeEvent]) -> Iterator[str]:
+    """Formats records as CSV lines, starting with a header."""
+    yield CSV_HEADER + '\n'
+    for record in records:
+        fields = _fields(record)
+        yield (f'{fields["timestamp"]},{fields["time"]},{fields["deck_id"]},{fields["event"]},'
+               f'{fields["delta"]:.3f},{fields["life"]:.3f}\n')
+
+
+def to_jsonl(records: Iterator[LifeEvent]) -> Iterator[str]:
+    """Formats records as JSON Lines."""
+    for record in records:
+        yield json.dumps(_fields(record)) + '\n'
+
+
+FORMATS = {'csv': to_csv, 'jsonl': to_jsonl}
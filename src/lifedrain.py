@@ -3,12 +3,15 @@
 
 from __future__ import annotations
 
+from pathlib import Path
 from typing import TYPE_CHECKING, Any, Union
 
-from . import settings
 from .database import DeckConf, GlobalConf
 from .deck_manager import DeckManager
 from .decorators import must_be_enabled
+from .diagnostics import Diagnostics
+from .event_log import EVENT_LOG_FILE
+from .storage import STATE_STORE_FILE, StateStore
 
 if TYPE_CHECKING:
     from anki.cards import Card
@@ -24,6 +27,8 @@ class Lifedrain:
     Attributes:
         config: An instance of GlobalConf.
         deck_manager: An instance of DeckManager.
+        diagnostics: An instance of Diagnostics, measuring the add-on's callbacks.
+        store: An instance of StateStore, the profile's database.
         status: A dictionary that keeps track the events on Anki.
     """
 
@@ -37,19 +42,59 @@ class Lifedrain:
         self._qt = qt
         self._mw = mw
         self.config = GlobalConf(mw)
-        self._deck_config = DeckConf(mw)
-        self.deck_manager = DeckManager(mw, qt, self.config, self._deck_config)
+        self.diagnostics = Diagnostics()
+        self.store = StateStore()
+        self._deck_config = DeckConf(mw, self.config, self.store)
+        self.deck_manager = DeckManager(
+            mw, qt, self.config, self._deck_config, self.diagnostics)
         self.status: dict[str, Any] = {
             'action': None,  # Flag for bury, suspend, delete
             'reviewed': False,
             'review_response': 0,
             'screen': None,
             'shortcuts': [],
-            'card_type': None,
+            'card_type': 2,  # As Card.type. Taken as review until a question is shown
         }
 
+    def collection_loaded(self) -> None:
+        """Called when Anki finishes loading the collection."""
+        self._deck_config.build_index()
+        self.diagnostics.enabled = self.config.get()['enableDiagnostics']
+        self.deck_manager.reset_bars()  # Restored from the state store when used
+
+    def profile_opened(self) -> None:
+        """Called when a profile is opened. Starts logging into its folder."""
+        profile_folder = Path(self._mw.pm.profileFolder())
+        self.deck_manager.event_log.open(profile_folder / EVENT_LOG_FILE)
+        self.store.open(profile_folder / STATE_STORE_FILE,
+                        legacy_decks=self.config.get().get('decks', {}))
+
+    def profile_closing(self) -> None:
+        """Called before a profile is closed. Writes the pending changes.
+
+        A failed write of the configuration is reported with a warning, so that
+        it does not interrupt the closing of the profile.
+        """
+        self.deck_manager.save_snapshots()
+        self.deck_manager.event_log.close()
+        self.store.close()
+        error = self.config.flush()
+        if error is not None:
+            self._qt.QMessageBox.warning(
+                self._mw, 'Life Drain', f'Failed to save the configuration: {error}')
+
+    def decks_changed(self) -> None:
+        """Called when decks are added, renamed or removed."""
+        self._deck_config.update_tree()
+
+    def config_updated(self) -> None:
+        """Called when the configuration is changed from Anki's add-on manager."""
+        self.config.invalidate()
+        self.diagnostics.enabled = self.config.get()['enableDiagnostics']
+
     def global_settings(self) -> None:
         """Opens a dialog with the Global Settings."""
+        from . import settings  # noqa: PLC0415 (the dialogs are only loaded when opened)
         drain_enabled = self.deck_manager.timer.isActive()
         self.toggle_drain(enable=False)
         settings.global_settings(
@@ -57,8 +102,10 @@ class Lifedrain:
             mw=self._mw,
             config=self.config,
             deck_manager=self.deck_manager,
+            diagnostics=self.diagnostics,
         )
         config = self.config.get()
+        self.diagnostics.enabled = config['enableDiagnostics']
         if config['enable']:
             self.update_global_shortcuts()
             self.toggle_drain(drain_enabled)
@@ -69,6 +116,7 @@ class Lifedrain:
 
     def deck_settings(self) -> None:
         """Opens a dialog with the Deck Settings."""
+        from . import settings  # noqa: PLC0415 (the dialogs are only loaded when opened)
         drain_enabled = self.deck_manager.timer.isActive()
         self.toggle_drain(enable=False)
         settings.deck_settings(
@@ -184,4 +232,4 @@ class Lifedrain:
         if is_active and enable is not True:
             self.deck_manager.timer.stop()
         elif not is_active and enable is not False:
-            self.deck_manager.timer.start()
+            self.deck_manager.start_timer()
@@ -21,6 +21,8 @@ def main() -> None:
 
     lifedrain = Lifedrain(mw, qt)
 
+    setup_collection(lifedrain)
+    setup_profile(lifedrain)
     setup_shortcuts(lifedrain)
     setup_state_change(lifedrain)
     setup_deck_browser(lifedrain)
@@ -28,10 +30,33 @@ def main() -> None:
     setup_review(lifedrain)
 
     mw.addonManager.setConfigAction(__name__, lifedrain.global_settings)
+    mw.addonManager.setConfigUpdatedAction(
+        __name__, lambda conf: lifedrain.config_updated())  # noqa: ARG005
+
+
+def setup_collection(lifedrain: Lifedrain) -> None:
+    """Set hooks triggered when the collection is loaded or its decks change."""
+    wrap = lifedrain.diagnostics.wrap
+
+    def operation_executed(changes: Any, handler: Any) -> None:  # noqa: ARG001
+        if changes.deck:
+            lifedrain.decks_changed()
+
+    gui_hooks.collection_did_load.append(wrap(
+        'collection_did_load', lambda col: lifedrain.collection_loaded()))  # noqa: ARG005
+    gui_hooks.operation_did_execute.append(wrap('operation_did_execute', operation_executed))
+
+
+def setup_profile(lifedrain: Lifedrain) -> None:
+    """Set hooks triggered when a profile is opened or closed."""
+    wrap = lifedrain.diagnostics.wrap
+    gui_hooks.profile_did_open.append(wrap('profile_did_open', lifedrain.profile_opened))
+    gui_hooks.profile_will_close.append(wrap('profile_will_close', lifedrain.profile_closing))
 
 
 def setup_shortcuts(lifedrain: Lifedrain) -> None:
     """Configure the shortcuts provided by the add-on."""
+    wrap = lifedrain.diagnostics.wrap
 
     def state_shortcuts(state: str, shortcuts: list[tuple]) -> None:
         if state == 'review':
@@ -39,13 +64,16 @@ def setup_shortcuts(lifedrain: Lifedrain) -> None:
         elif state == 'overview':
             lifedrain.overview_shortcuts(shortcuts)
 
-    gui_hooks.collection_did_load.append(lambda col: lifedrain.update_global_shortcuts())  # noqa: ARG005
-    gui_hooks.state_shortcuts_will_change.append(state_shortcuts)
+    gui_hooks.collection_did_load.append(wrap(
+        'collection_did_load', lambda col: lifedrain.update_global_shortcuts()))  # noqa: ARG005
+    gui_hooks.state_shortcuts_will_change.append(
+        wrap('state_shortcuts_will_change', state_shortcuts))
 
 
 def setup_state_change(lifedrain: Lifedrain) -> None:
     """Set hooks triggered when changing state."""
-    gui_hooks.state_will_change.append(lambda *args: lifedrain.screen_change(args[0]))
+    gui_hooks.state_will_change.append(lifedrain.diagnostics.wrap(
+        'state_will_change', lambda *args: lifedrain.screen_change(args[0])))
 
 
 def setup_deck_browser(lifedrain: Lifedrain) -> None:
@@ -66,7 +94,8 @@ def setup_deck_browser(lifedrain: Lifedrain) -> None:
         mw.col.decks.select(did)
         lifedrain.deck_settings()
 
-    gui_hooks.deck_browser_will_show_options_menu.append(options_menu)
+    gui_hooks.deck_browser_will_show_options_menu.append(
+        lifedrain.diagnostics.wrap('deck_browser_will_show_options_menu', options_menu))
 
 
 def setup_overview(lifedrain: Lifedrain) -> None:
@@ -86,39 +115,50 @@ def setup_overview(lifedrain: Lifedrain) -> None:
 
         return custom_link_handler
 
-    gui_hooks.overview_will_render_bottom.append(bottom_bar_draw)
+    gui_hooks.overview_will_render_bottom.append(
+        lifedrain.diagnostics.wrap('overview_will_render_bottom', bottom_bar_draw))
 
 
 def setup_review(lifedrain: Lifedrain) -> None:
     """Set hooks triggered while reviewing."""
-    gui_hooks.reviewer_did_show_question.append(lifedrain.show_question)
-    gui_hooks.reviewer_did_show_answer.append(
-        lambda card: lifedrain.show_answer())  # noqa: ARG005
-    gui_hooks.reviewer_did_answer_card.append(
-        lambda *args: lifedrain.status.update({'review_response': args[2]}))
+    wrap = lifedrain.diagnostics.wrap
+    gui_hooks.reviewer_did_show_question.append(
+        wrap('reviewer_did_show_question', lifedrain.show_question))
+    gui_hooks.reviewer_did_show_answer.append(wrap(
+        'reviewer_did_show_answer', lambda card: lifedrain.show_answer()))  # noqa: ARG005
+    gui_hooks.reviewer_did_answer_card.append(wrap(
+        'reviewer_did_answer_card',
+        lambda *args: lifedrain.status.update({'review_response': args[2]})))
     if hasattr(gui_hooks, 'review_did_undo'):
-        gui_hooks.review_did_undo.append(
-            lambda card_id: lifedrain.status.update({'action': 'undo'}))  # noqa: ARG005
-    gui_hooks.state_did_undo.append(
-        lambda out: lifedrain.status.update({'action': 'undo'}))  # noqa: ARG005
-
-    gui_hooks.browser_will_show.append(
-        lambda browser: lifedrain.opened_window())  # noqa: ARG005
-    gui_hooks.editor_did_init.append(
-        lambda editor: lifedrain.opened_window())  # noqa: ARG005
-    gui_hooks.deck_options_did_load.append(
-        lambda deck_options: lifedrain.opened_window())  # noqa: ARG005
-    gui_hooks.filtered_deck_dialog_did_load_deck.append(
-        lambda *args: lifedrain.opened_window())  # noqa: ARG005
+        gui_hooks.review_did_undo.append(wrap(
+            'review_did_undo',
+            lambda card_id: lifedrain.status.update({'action': 'undo'})))  # noqa: ARG005
+    gui_hooks.state_did_undo.append(wrap(
+        'state_did_undo', lambda out: lifedrain.status.update({'action': 'undo'})))  # noqa: ARG005
+
+    gui_hooks.browser_will_show.append(wrap(
+        'browser_will_show', lambda browser: lifedrain.opened_window()))  # noqa: ARG005
+    gui_hooks.editor_did_init.append(wrap(
+        'editor_did_init', lambda editor: lifedrain.opened_window()))  # noqa: ARG005
+    gui_hooks.deck_options_did_load.append(wrap(
+        'deck_options_did_load', lambda deck_options: lifedrain.opened_window()))  # noqa: ARG005
+    gui_hooks.filtered_deck_dialog_did_load_deck.append(wrap(
+        'filtered_deck_dialog_did_load_deck',
+        lambda *args: lifedrain.opened_window()))  # noqa: ARG005
 
     # Action on cards
-    hooks.notes_will_be_deleted.append(
-        lambda *args: lifedrain.status.update({'action': 'delete'}))  # noqa: ARG005
-    gui_hooks.reviewer_will_suspend_note.append(
-        lambda *args: lifedrain.status.update({'action': 'suspend'}))  # noqa: ARG005
-    gui_hooks.reviewer_will_suspend_card.append(
-        lambda *args: lifedrain.status.update({'action': 'suspend'}))  # noqa: ARG005
-    gui_hooks.reviewer_will_bury_note.append(
-        lambda *args: lifedrain.status.update({'action': 'bury'}))  # noqa: ARG005
-    gui_hooks.reviewer_will_bury_card.append(
-        lambda *args: lifedrain.status.update({'action': 'bury'}))  # noqa: ARG005
+    hooks.notes_will_be_deleted.append(wrap(
+        'notes_will_be_deleted',
+        lambda *args: lifedrain.status.update({'action': 'delete'})))  # noqa: ARG005
+    gui_hooks.reviewer_will_suspend_note.append(wrap(
+        'reviewer_will_suspend_note',
+        lambda *args: lifedrain.status.update({'action': 'suspend'})))  # noqa: ARG005
+    gui_hooks.reviewer_will_suspend_card.append(wrap(
+        'reviewer_will_suspend_card',
+        lambda *args: lifedrain.status.update({'action': 'suspend'})))  # noqa: ARG005
+    gui_hooks.reviewer_will_bury_note.append(wrap(
+        'reviewer_will_bury_note',
+        lambda *args: lifedrain.status.update({'action': 'bury'})))  # noqa: ARG005
+    gui_hooks.reviewer_will_bury_card.append(wrap(
+        'reviewer_will_bury_card',
+        lambda *args: lifedrain.status.update({'action': 'bury'})))  # noqa: ARG005
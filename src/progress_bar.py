@@ -4,19 +4,86 @@
 from __future__ import annotations
 
 import math
-from typing import TYPE_CHECKING, Any, Literal
+import re
+from typing import TYPE_CHECKING, Any, Callable, Literal, Optional
 
+from .bar_state import LIFE_SCALE
 from .defaults import POSITION_OPTIONS, TEXT_FORMAT
 
 if TYPE_CHECKING:
     from aqt.main import AnkiQt
 
+TEXT_TOKENS: dict[str, Callable[[int, int, int], str]] = {
+    '%v': lambda current, maximum, rate: str(current),  # noqa: ARG005
+    '%m': lambda current, maximum, rate: str(maximum),  # noqa: ARG005
+    '%p': lambda current, maximum, rate: str(int(100 * current / maximum)),  # noqa: ARG005
+}
+QT_STEP = LIFE_SCALE // 10  # Life represented by one unit of the QProgressBar
+
+
+def register_text_token(token: str, func: Callable[[int, int, int], str]) -> None:
+    """Adds a token that can be used in the Progress Bar text format.
+
+    Takes effect on the next call of `ProgressBar.set_style`. For example, the
+    seconds left at the current rate:
+    `register_text_token('%r', lambda current, maximum, rate: ...)`.
+
+    Args:
+        token: The token, e.g. '%r'.
+        func: Receives the current value (in seconds, rounded up), the maximum
+            value (in seconds) and the rate at which the life changes (in
+            LIFE_SCALE units per second, negative while draining), and returns
+            the text that replaces the token. It must only depend on these.
+    """
+    TEXT_TOKENS[token] = func
+
+
+def compile_text_format(text_format: str, max_value: int) -> Callable[[int, int], str]:
+    """Compiles a text format into a function that formats the current value.
+
+    The format string is parsed only once, and the formatted texts are memoized
+    by the displayed value and the rate. The compiled function takes the current
+    value and the rate, as given to the token functions.
+
+    Args:
+        text_format: A format from TEXT_FORMAT, or any string with TEXT_TOKENS.
+        max_value: The maximum value of the bar, in LIFE_SCALE units.
+    """
+    if text_format == 'mm:ss':
+        time_cache: dict[int, str] = {}
+
+        def format_time(value: int, rate: int) -> str:  # noqa: ARG001
+            seconds = value // LIFE_SCALE
+            text = time_cache.get(seconds)
+            if text is None:
+                text = time_cache[seconds] = f'{seconds // 60:01d}:{seconds % 60:02d}'
+            return text
+        return format_time
+
+    maximum = max_value // LIFE_SCALE
+    tokens = sorted(TEXT_TOKENS, key=len, reverse=True)
+    parts = re.split(f'({"|".join(map(re.escape, tokens))})', text_format)
+    token_funcs = [(TEXT_TOKENS.get(part), part) for part in parts if part]
+    cache: dict[tuple[int, int], str] = {}
+
+    def format_value(value: int, rate: int) -> str:
+        current = -(-value // LIFE_SCALE)  # Rounded up
+        text = cache.get((current, rate))
+        if text is None:
+            text = cache[current, rate] = ''.join(
+                part if func is None else func(current, maximum, rate)
+                for func, part in token_funcs
+            )
+        return text
+    return format_value
+
 
 class ProgressBar:
     """Implements a Progress Bar to be used on Anki.
 
-    Creates an interface with QProgressBar to make its usage on Anki easier. It
-    also adds a (limited) ability to use decimal values as the current value.
+    Creates an interface with QProgressBar to make its usage on Anki easier.
+    Values are integers in LIFE_SCALE units, and are shown with a precision of
+    QT_STEP.
     """
 
     def __init__(self, mw: AnkiQt, qt: Any):
@@ -29,12 +96,19 @@ class ProgressBar:
         self._mw = mw
         self._qt = qt
         self._qprogressbar = qt.QProgressBar()
-        self._current_value: float = 1
+        self._current_value: int = LIFE_SCALE
         self._dock: dict[str, Any] = {}
-        self._max_value: float = 1
+        self._max_value: int = LIFE_SCALE
         self._text_format: str = ''
+        self._format_text: Callable[[int, int], str] = lambda value, rate: str(value)  # noqa: ARG005
+        self._rate: int = -LIFE_SCALE
         self._current_bar_color: str = ''
+        self._current_text: Optional[str] = None
+        self._current_qt_value: Optional[int] = None
         self._bar_options: dict[str, Any] = {}
+        self._tier_styles: dict[str, tuple[Optional[str], Any]] = {}
+        self._qstyles: dict[str, Any] = {}
+        self._render_stats: dict[str, int] = {'performed': 0, 'skipped': 0}
 
     def set_visible(self, *, visible: bool) -> None:
         """Sets the visibility of the Progress Bar.
@@ -47,57 +121,110 @@ class ProgressBar:
     def reset_bar(self) -> None:
         """Resets the current value back to the maximum."""
         self._current_value = self._max_value
-        self._validate_current_value()
-        self._update_text()
-        self._update_bar_color()
+        self._render()
 
-    def set_max_value(self, max_value: float) -> None:
+    def set_max_value(self, max_value: int) -> None:
         """Sets the maximum value for the bar.
 
         Args:
-            max_value: The maximum value of the bar. Up to 1 decimal place.
+            max_value: The maximum value of the bar.
         """
-        self._max_value = max(1, max_value)
-        self._qprogressbar.setRange(0, self._max_value * 10)
+        self._max_value = max(LIFE_SCALE, max_value)
+        self._qprogressbar.setRange(0, self._max_value // QT_STEP)
+        self._format_text = compile_text_format(self._text_format, self._max_value)
+        self._current_qt_value = None
+        self._current_text = None
 
-    def set_current_value(self, current_value: float) -> None:
+    def set_current_value(self, current_value: int) -> None:
         """Sets the current value for the bar.
 
         Args:
-            current_value: The current value of the bar. Up to 1 decimal place.
+            current_value: The current value of the bar.
         """
         self._current_value = current_value
-        self._validate_current_value()
-        self._update_text()
-        self._update_bar_color()
+        self._render()
 
-    def inc_current_value(self, increment: float) -> None:
+    def inc_current_value(self, increment: int) -> None:
         """Increments the current value of the bar.
 
         Args:
-            increment: A positive or negative number. Up to 1 decimal place.
+            increment: A positive or negative number.
         """
         self._current_value += increment
-        self._validate_current_value()
-        self._update_text()
-        self._update_bar_color()
+        self._render()
+
+    def set_rate(self, rate: int) -> None:
+        """Sets the rate at which the current value changes, shown by some text tokens.
+
+        Args:
+            rate: How much the current value changes per second.
+        """
+        if rate != self._rate:
+            self._rate = rate
+            self._update_text()
 
-    def get_current_value(self) -> float:
+    def get_current_value(self) -> int:
         """Gets the current value of the bar."""
         return self._current_value
 
+    def get_render_stats(self) -> dict[str, int]:
+        """Gets how many value changes were rendered, and how many were skipped."""
+        return dict(self._render_stats)
+
+    def time_to_next_change(self, rate: int) -> Optional[int]:
+        """Estimates when the bar will look different at a constant rate.
+
+        A visible change is a step of one pixel in the bar, a change in its
+        text, a color threshold crossing, or reaching zero or the maximum.
+
+        Args:
+            rate: How much the current value changes per second.
+
+        Returns:
+            The time in milliseconds until the next visible change, or None if
+            the bar will never change.
+        """
+        if rate == 0:
+            return None
+
+        current = self._current_value
+        maximum = self._max_value
+        distances = [current if rate < 0 else maximum - current]
+
+        width = self._qprogressbar.width()
+        if width > 0:
+            distances.append(self._distance_to_step(current, maximum / width, rate))
+        if self._text_format:
+            distances.append(self._distance_to_step(current, LIFE_SCALE, rate))
+
+        options = self._bar_options
+        for threshold in (options['thresholdWarn'], options['thresholdDanger']):
+            boundary = threshold * maximum / 100
+            if (rate < 0 and current > boundary) or (rate > 0 and current <= boundary):
+                distances.append(abs(current - boundary))
+
+        return math.ceil(min(distances) * 1000 / abs(rate))
+
     def set_style(self, options: dict[str, Any]) -> None:
         """Sets the styling of the Progress Bar.
 
         Args:
             options: A dictionary with bar styling information.
         """
+        if options == self._bar_options:
+            return
+
         self._bar_options = options
         text_format = TEXT_FORMAT[options['text']]
         self._qprogressbar.setTextVisible('format' in text_format)
         if 'format' in text_format:
             self._text_format = text_format['format']
             self._qprogressbar.setFormat(text_format['format'])
+        else:
+            self._text_format = ''
+        self._format_text = compile_text_format(self._text_format, self._max_value)
+        self._current_text = None
+        self._build_tier_styles()
         self._current_bar_color = ''
         self._update_bar_color()
         self._qprogressbar.setInvertedAppearance(options['invert'])
@@ -144,67 +271,100 @@ class ProgressBar:
         self._mw.web.setFocus()
         self._qprogressbar.setVisible(bar_visible)
 
-    def _validate_current_value(self) -> None:
-        """Asserts that the current value is between [0; max]."""
+    def _render(self) -> None:
+        """Updates the QProgressBar, only touching what is visibly different."""
+        value_changed = self._validate_current_value()
+        text_changed = self._update_text()
+        color_changed = self._update_bar_color()
+        if value_changed or text_changed or color_changed:
+            self._render_stats['performed'] += 1
+        else:
+            self._render_stats['skipped'] += 1
+
+    def _validate_current_value(self) -> bool:
+        """Asserts that the current value is between [0; max].
+
+        Returns:
+            True if the value shown by the QProgressBar changed.
+        """
         if self._current_value > self._max_value:
             self._current_value = self._max_value
         elif self._current_value < 0:
             self._current_value = 0
-        self._qprogressbar.setValue(int(self._current_value * 10))
+
+        qt_value = self._current_value // QT_STEP
+        if qt_value == self._current_qt_value:
+            return False
+        self._current_qt_value = qt_value
+        self._qprogressbar.setValue(qt_value)
         self._qprogressbar.update()
+        return True
 
-    def _update_text(self) -> None:
-        """Updates the Progress Bar text."""
+    def _update_text(self) -> bool:
+        """Updates the Progress Bar text.
+
+        Returns:
+            True if the text changed.
+        """
         if not self._text_format:
-            return
-        if self._text_format == 'mm:ss':
-            minutes = int(self._current_value / 60)
-            seconds = int(self._current_value) % 60
-            self._qprogressbar.setFormat(f'{minutes:01d}:{seconds:02d}')
-        else:
-            current_value = math.ceil(self._current_value)
-            max_value = int(self._max_value)
-            text = self._text_format
-            text = text.replace('%v', str(current_value))
-            text = text.replace('%m', str(max_value))
-            text = text.replace('%p', str(int(100 * current_value / max_value)))
-            self._qprogressbar.setFormat(text)
-
-    def _update_bar_color(self) -> None:
-        """Updates the Progress Bar color styling."""
+            return False
+        text = self._format_text(self._current_value, self._rate)
+        if text == self._current_text:
+            return False
+        self._current_text = text
+        self._qprogressbar.setFormat(text)
+        return True
+
+    def _update_bar_color(self) -> bool:
+        """Updates the Progress Bar color styling.
+
+        Returns:
+            True if the color changed.
+        """
         options = self._bar_options
 
-        life_percentage = self._current_value / self._max_value * 100
+        # Same as comparing the life percentage with the thresholds, without division
+        life = self._current_value * 100
         bar_color = options['fgColor']
-        if life_percentage <= options['thresholdDanger']:
+        if life <= options['thresholdDanger'] * self._max_value:
             bar_color = options['fgColorDanger']
-        elif life_percentage <= options['thresholdWarn']:
+        elif life <= options['thresholdWarn'] * self._max_value:
             bar_color = options['fgColorWarn']
 
         if self._current_bar_color == bar_color:
-            return
+            return False
 
         self._current_bar_color = bar_color
-        available_styles = self._qt.QStyleFactory.keys()
-
-        if options['customStyle'] and options['customStyle'] <= len(available_styles):
-            qstyle = self._qt.QStyleFactory.create(available_styles[options['customStyle'] - 1])
-            self._qprogressbar.setStyle(qstyle)
+        stylesheet, palette = self._tier_styles[bar_color]
+        if palette is None:
+            self._qprogressbar.setStyleSheet(stylesheet)
+        else:
+            self._qprogressbar.setPalette(palette)
+        return True
 
-            palette = self._qt.QPalette()
-            palette.setColor(self._qt.QPalette.ColorRole.Highlight, self._qt.QColor(bar_color))
+    def _build_tier_styles(self) -> None:
+        """Precomputes the styling of each color tier (default, warn and danger).
 
-            if 'bgColor' in options:
-                bg_color = self._qt.QColor(options['bgColor'])
-                palette.setColor(self._qt.QPalette.ColorRole.Base, bg_color)
-                palette.setColor(self._qt.QPalette.ColorRole.Window, bg_color)
+        With a custom style, the QStyle and the stylesheet are applied here, and
+        each tier only has its own palette. With the default style, each tier
+        has its own stylesheet.
+        """
+        options = self._bar_options
+        colors = {options['fgColor'], options['fgColorWarn'], options['fgColorDanger']}
+        available_styles = self._qt.QStyleFactory.keys()
 
-            self._qprogressbar.setPalette(palette)
+        if options['customStyle'] and options['customStyle'] <= len(available_styles):
+            style_name = available_styles[options['customStyle'] - 1]
+            if style_name not in self._qstyles:
+                self._qstyles[style_name] = self._qt.QStyleFactory.create(style_name)
+            self._qprogressbar.setStyle(self._qstyles[style_name])
 
             bar_elem_dict = {'max-height': f'{options["height"]}px'}
             bar_elem = self._dict_to_css(bar_elem_dict)
             self._qprogressbar.setStyleSheet(
                 f'QProgressBar {{ {bar_elem} }}')
+
+            self._tier_styles = {color: (None, self._build_palette(color)) for color in colors}
         else:
             # Default style
             bar_elem_dict = {
@@ -217,14 +377,47 @@ class ProgressBar:
                 bar_elem_dict['background-color'] = options['bgColor']
 
             bar_elem = self._dict_to_css(bar_elem_dict)
-            bar_chunk = self._dict_to_css({
-                'background-color': bar_color,
-                'margin': '0px',
-                'border-radius': f'{options["borderRadius"]}px'})
+            self._tier_styles = {}
+            for color in colors:
+                bar_chunk = self._dict_to_css({
+                    'background-color': color,
+                    'margin': '0px',
+                    'border-radius': f'{options["borderRadius"]}px'})
+                stylesheet = (f'QProgressBar {{ {bar_elem} }}'
+                              f'QProgressBar::chunk {{ {bar_chunk} }}')
+                self._tier_styles[color] = (stylesheet, None)
+
+    def _build_palette(self, bar_color: str) -> Any:
+        """Creates the palette used by custom styles.
 
-            self._qprogressbar.setStyleSheet(
-                f'QProgressBar {{ {bar_elem} }}'
-                f'QProgressBar::chunk {{ {bar_chunk} }}')
+        Args:
+            bar_color: The color of the bar's foreground.
+        """
+        palette = self._qt.QPalette()
+        palette.setColor(self._qt.QPalette.ColorRole.Highlight, self._qt.QColor(bar_color))
+
+        if 'bgColor' in self._bar_options:
+            bg_color = self._qt.QColor(self._bar_options['bgColor'])
+            palette.setColor(self._qt.QPalette.ColorRole.Base, bg_color)
+            palette.setColor(self._qt.QPalette.ColorRole.Window, bg_color)
+        return palette
+
+    @staticmethod
+    def _distance_to_step(value: float, step: float, rate: float) -> float:
+        """Distance from a value to the next multiple of step, in the direction of rate.
+
+        A value exactly on a boundary may change with any movement, so its
+        distance is zero.
+
+        Args:
+            value: The starting value.
+            step: The distance between two consecutive boundaries.
+            rate: A negative number to look downwards, positive to look upwards.
+        """
+        offset = value % step
+        if offset == 0:
+            return 0
+        return offset if rate < 0 else step - offset
 
     @staticmethod
     def _dict_to_css(dictionary: dict[str, str]) -> str:
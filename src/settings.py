@@ -3,17 +3,24 @@
 
 from __future__ import annotations
 
+from functools import partial
 from operator import itemgetter
-from typing import TYPE_CHECKING, Any, Iterator, Optional, Union
+from typing import TYPE_CHECKING, Any, Iterator, Mapping, Optional, Sequence, Union
 
+from .bar_state import CARD_TYPES, EASES, answer_matrix
 from .defaults import BEHAVIORS, DEFAULTS, POSITION_OPTIONS, TEXT_FORMAT
+from .exceptions import GetCollectionError
 from .version import VERSION
 
 if TYPE_CHECKING:
+    from anki.collection import Collection
     from aqt.main import AnkiQt
 
     from .database import DeckConf, GlobalConf
     from .deck_manager import DeckManager
+    from .diagnostics import Diagnostics
+
+_dialogs: dict[str, Any] = {}  # Built on first use, and reused afterwards
 
 
 class Form:
@@ -168,6 +175,49 @@ class Form:
         self._layout.addWidget(double_spin_box, self._row, 2, 1, 2)
         self._row += 1
 
+    def spin_box_grid(self, sg_name: str, rows: Sequence[str], columns: Sequence[str],
+                      val_range: list[int], tooltip: Optional[str]=None) -> None:
+        """Creates a grid of spin boxes in the current row of the form.
+
+        Args:
+            sg_name: The name of the grid. Not visible by the user.
+            rows: The labels of the rows.
+            columns: The labels of the columns.
+            val_range: A list of two integers that are the range.
+            tooltip: The tooltip to be shown.
+        """
+        grid = self._qt.QWidget(self.widget)
+        layout = self._qt.QGridLayout(grid)
+        layout.setContentsMargins(0, 0, 0, 0)
+        for column, column_text in enumerate(columns, start=1):
+            layout.addWidget(self._qt.QLabel(column_text), 0, column)
+
+        spin_boxes = []
+        for row, row_text in enumerate(rows, start=1):
+            layout.addWidget(self._qt.QLabel(row_text), row, 0)
+            row_spin_boxes = []
+            for column in range(1, len(columns) + 1):
+                spin_box = self._qt.QSpinBox(grid)
+                spin_box.setRange(val_range[0], val_range[1])
+                layout.addWidget(spin_box, row, column)
+                row_spin_boxes.append(spin_box)
+            spin_boxes.append(row_spin_boxes)
+        if tooltip is not None:
+            grid.setToolTip(tooltip)
+
+        def set_value(values: list[list[float]]) -> None:
+            for row_spin_boxes, row_values in zip(spin_boxes, values):
+                for spin_box, value in zip(row_spin_boxes, row_values):
+                    spin_box.setValue(round(value))
+
+        grid.get_value = lambda: [
+            [spin_box.value() for spin_box in row_spin_boxes] for row_spin_boxes in spin_boxes]
+        grid.set_value = set_value
+
+        setattr(self.widget, sg_name, grid)
+        self._layout.addWidget(grid, self._row, 0, 1, 4)
+        self._row += 1
+
     def color_select(self, cs_name: str, label_text: str, tooltip: Optional[str]=None) -> None:
         """Creates a color select in the current row of the form.
 
@@ -224,20 +274,21 @@ class Form:
         self._row += 1
 
 
-def global_settings(aqt: Any, mw: AnkiQt, config: GlobalConf, deck_manager: DeckManager) -> None:
+def global_settings(aqt: Any, mw: AnkiQt, config: GlobalConf, deck_manager: DeckManager,
+                    diagnostics: Diagnostics) -> None:
     """Opens a dialog with the Global Settings."""
+    dialog = _dialogs.get('global')
+    if dialog is None:
+        dialog = _global_settings_dialog(aqt, mw, config, deck_manager, diagnostics)
+        _dialogs['global'] = dialog
+    dialog.load_data(config.get())
+    dialog.exec()
 
-    def save() -> None:
-        enable_damage = deck_defaults_tab.enableDamageInput.isChecked()
 
-        damage = None
-        damage_new = None
-        damage_learning = None
-        if enable_damage:
-            damage = deck_defaults_tab.damageInput.value()
-            damage_new = deck_defaults_tab.damageNewInput.value()
-            damage_learning = deck_defaults_tab.damageLearningInput.value()
+def _global_settings_dialog(aqt: Any, mw: AnkiQt, config: GlobalConf,
+                            deck_manager: DeckManager, diagnostics: Diagnostics) -> Any:
 
+    def save() -> None:
         conf = {
             'enable': basic_tab.enableAddon.get_value(),
             'stopOnAnswer': basic_tab.stopOnAnswer.get_value(),
@@ -250,6 +301,8 @@ def global_settings(aqt: Any, mw: AnkiQt, config: GlobalConf, deck_manager: Deck
             'behavUndo': basic_tab.behavUndo.get_value(),
             'behavBury': basic_tab.behavBury.get_value(),
             'behavSuspend': basic_tab.behavSuspend.get_value(),
+            'undoDepth': basic_tab.undoDepth.get_value(),
+            'enableDiagnostics': basic_tab.enableDiagnostics.get_value(),
             'invert': bar_style_tab.invert.get_value(),
             'barPosition': bar_style_tab.positionList.get_value(),
             'barHeight': bar_style_tab.heightInput.get_value(),
@@ -264,13 +317,8 @@ def global_settings(aqt: Any, mw: AnkiQt, config: GlobalConf, deck_manager: Deck
             'barTextColor': bar_style_tab.textColorDialog.get_value(),
             'enableBgColor': bar_style_tab.enableBgColor.get_value(),
             'barBgColor': bar_style_tab.bgColorDialog.get_value(),
-            'shareDrain': deck_defaults_tab.shareDrain.get_value(),
-            'maxLife': deck_defaults_tab.maxLifeInput.value(),
-            'recover': deck_defaults_tab.recoverInput.value(),
-            'fullRecoverSpeed': deck_defaults_tab.fullRecoverInput.value(),
-            'damage': damage,
-            'damageNew': damage_new,
-            'damageLearning': damage_learning,
+            **deck_defaults_tab.get_data(),
+            'answerMatrix': answers_tab.get_data(),
         }
         config.update(conf)
         if conf['shareDrain']:
@@ -279,28 +327,47 @@ def global_settings(aqt: Any, mw: AnkiQt, config: GlobalConf, deck_manager: Deck
 
         return dialog.accept()
 
+    def update_answers(*_: Any) -> None:
+        answers_tab.update_data({**deck_defaults_tab.get_data(), 'answerMatrix': None})
+
     def clicked(button: Any) -> None:
         if button_box.buttonRole(button) == aqt.QDialogButtonBox.ButtonRole.ResetRole:
-            _global_settings_restore_defaults(basic_tab, bar_style_tab, deck_defaults_tab)
+            _global_settings_restore_defaults(
+                basic_tab, bar_style_tab, deck_defaults_tab, answers_tab)
+            update_answers()
+        elif button == diagnostics_button:
+            diagnostics_dialog(aqt, dialog, diagnostics)
+
+    def load_data(conf: dict[str, Any]) -> None:
+        basic_tab.load_data(conf)
+        bar_style_tab.load_data(conf)
+        deck_defaults_tab.load_data(conf)
+        answers_tab.load_data(conf)
+        update_answers()
 
-    conf = config.get()
     dialog = aqt.QDialog(mw)
     dialog.setWindowTitle(f'Life Drain Global Settings (v{VERSION})')
 
-    basic_tab = _global_basic_tab(aqt, conf)
-    bar_style_tab = _global_bar_style_tab(aqt, conf)
-    deck_defaults_tab = _global_deck_defaults(aqt, conf)
+    basic_tab = _global_basic_tab(aqt)
+    bar_style_tab = _global_bar_style_tab(aqt)
+    deck_defaults_tab = _global_deck_defaults(aqt)
+    answers_tab = _deck_answers_tab(aqt)
 
     tab_widget = aqt.QTabWidget()
     tab_widget.addTab(basic_tab, 'Basic')
     tab_widget.addTab(bar_style_tab, 'Bar Style')
     tab_widget.addTab(deck_defaults_tab, 'Deck Defaults')
+    tab_widget.addTab(answers_tab, 'Answers')
+    tab_widget.currentChanged.connect(update_answers)
+    answers_tab.customAnswers.stateChanged.connect(update_answers)
 
     button_box = aqt.QDialogButtonBox(
         aqt.QDialogButtonBox.StandardButton.Ok |
         aqt.QDialogButtonBox.StandardButton.Cancel |
         aqt.QDialogButtonBox.StandardButton.RestoreDefaults,
     )
+    diagnostics_button = button_box.addButton(
+        'Diagnostics', aqt.QDialogButtonBox.ButtonRole.ActionRole)
     button_box.rejected.connect(dialog.reject)
     button_box.accepted.connect(save)
     button_box.clicked.connect(clicked)
@@ -310,10 +377,58 @@ def global_settings(aqt: Any, mw: AnkiQt, config: GlobalConf, deck_manager: Deck
     outer_form.add_widget(button_box)
 
     dialog.setMinimumSize(400, 310)
+    dialog.load_data = load_data
+    return dialog
+
+
+def diagnostics_dialog(aqt: Any, parent: Any, diagnostics: Diagnostics) -> None:
+    """Opens a dialog with the latency of Life Drain's callbacks."""
+    columns = ['Callback', 'Calls', 'Total (ms)', 'p50 (ms)', 'p95 (ms)', 'Max (ms)']
+    table = aqt.QTableWidget(0, len(columns))
+    table.setHorizontalHeaderLabels(columns)
+    table.setEditTriggers(aqt.QAbstractItemView.EditTrigger.NoEditTriggers)
+    table.verticalHeader().setVisible(False)
+
+    def load_data() -> None:
+        rows = diagnostics.report()
+        table.setRowCount(len(rows))
+        for row_index, row in enumerate(rows):
+            values = [
+                row['name'], str(row['count']), f'{row["total"]:.1f}',
+                f'{row["p50"]:.3f}', f'{row["p95"]:.3f}', f'{row["max"]:.3f}',
+            ]
+            for column, value in enumerate(values):
+                table.setItem(row_index, column, aqt.QTableWidgetItem(value))
+        table.resizeColumnsToContents()
+
+    def clicked(button: Any) -> None:
+        if button_box.buttonRole(button) == aqt.QDialogButtonBox.ButtonRole.ResetRole:
+            diagnostics.reset()
+            load_data()
+
+    dialog = aqt.QDialog(parent)
+    dialog.setWindowTitle('Life Drain Diagnostics')
+
+    form = Form(aqt, dialog)
+    if not diagnostics.enabled:
+        form.label('Measuring is disabled. Enable it in the Global Settings, and save.',
+                   '#e67e22')
+    form.add_widget(table)
+
+    button_box = aqt.QDialogButtonBox(
+        aqt.QDialogButtonBox.StandardButton.Close |
+        aqt.QDialogButtonBox.StandardButton.Reset,
+    )
+    button_box.rejected.connect(dialog.reject)
+    button_box.clicked.connect(clicked)
+    form.add_widget(button_box)
+
+    load_data()
+    dialog.setMinimumSize(640, 400)
     dialog.exec()
 
 
-def _global_basic_tab(aqt: Any, conf: dict[str, Any]) -> Any:
+def _global_basic_tab(aqt: Any) -> Any:
 
     def generate_form() -> Any:
         tab = Form(aqt)
@@ -335,6 +450,10 @@ program behave when deleting a card/note?''')
 program behave when burying a card/note?''')
         tab.combo_box('behavSuspend', 'Suspend', BEHAVIORS, '''How should the \
 program behave when suspending a card/note?''')
+        tab.spin_box('undoDepth', 'Undo depth', [0, 10000], '''How many reviews \
+can have their life restored when undoing.''')
+        tab.check_box('enableDiagnostics', 'Measure callback latency', '''Record how \
+long Life Drain takes to respond to Anki. See the results with the Diagnostics button.''')
         tab.label('<b>Shortcuts</b>')
         shortcut_tooltip = '''
 There is no validation for your shortcut string, so edit with care!
@@ -358,17 +477,19 @@ Invalid shortcuts, or already used shortcuts won't work.'''
         widget.behavUndo.set_value(conf['behavUndo'])
         widget.behavBury.set_value(conf['behavBury'])
         widget.behavSuspend.set_value(conf['behavSuspend'])
+        widget.undoDepth.set_value(conf['undoDepth'])
+        widget.enableDiagnostics.set_value(conf['enableDiagnostics'])
         widget.globalShortcut.set_value(conf['globalSettingsShortcut'])
         widget.deckShortcut.set_value(conf['deckSettingsShortcut'])
         widget.pauseShortcut.set_value(conf['pauseShortcut'])
         widget.recoverShortcut.set_value(conf['recoverShortcut'])
 
     tab = generate_form()
-    load_data(tab, conf)
+    tab.load_data = partial(load_data, tab)
     return tab
 
 
-def _global_bar_style_tab(aqt: Any, conf: dict[str, Any]) -> Any:
+def _global_bar_style_tab(aqt: Any) -> Any:
 
     def generate_form() -> Any:
         tab = Form(aqt)
@@ -420,11 +541,11 @@ If checked, you can choose a background color on the next field.''')
         widget.bgColorDialog.set_value(conf['barBgColor'])
 
     tab = generate_form()
-    load_data(tab, conf)
+    tab.load_data = partial(load_data, tab)
     return tab
 
 
-def _global_deck_defaults(aqt: Any, conf: dict[str, Any]) -> Any:
+def _global_deck_defaults(aqt: Any) -> Any:
 
     def generate_form() -> Any:
         tab = Form(aqt)
@@ -449,13 +570,7 @@ answering with 'Again'.")
         tab.spin_box('damageInput', 'Review cards', [-1000, 1000],
                      'Damage value on review cards.')
         tab.fill_space()
-        return tab.widget
-
-    def load_data(widget: Any, conf: dict[str, Any]) -> None:
-        widget.shareDrain.set_value(conf['shareDrain'])
-        widget.maxLifeInput.set_value(conf['maxLife'])
-        widget.recoverInput.set_value(conf['recover'])
-        widget.fullRecoverInput.set_value(conf['fullRecoverSpeed'])
+        widget = tab.widget
 
         def update_damageinput() -> None:
             damage_enabled = widget.enableDamageInput.isChecked()
@@ -463,13 +578,21 @@ answering with 'Again'.")
             widget.damageNewInput.setEnabled(damage_enabled)
             widget.damageLearningInput.setEnabled(damage_enabled)
 
+        widget.enableDamageInput.stateChanged.connect(update_damageinput)
+        return widget
+
+    def load_data(widget: Any, conf: dict[str, Any]) -> None:
+        widget.shareDrain.set_value(conf['shareDrain'])
+        widget.maxLifeInput.set_value(conf['maxLife'])
+        widget.recoverInput.set_value(conf['recover'])
+        widget.fullRecoverInput.set_value(conf['fullRecoverSpeed'])
+
         enable_damage = conf['damage'] is not None
         damage = conf['damage'] if enable_damage else 5
         damage_new = conf['damageNew'] if conf['damageNew'] is not None else damage
         damage_learning = conf['damageLearning'] if conf['damageLearning'] is not None else damage
 
         widget.enableDamageInput.set_value(enable_damage)
-        widget.enableDamageInput.stateChanged.connect(update_damageinput)
         widget.damageInput.set_value(damage)
         widget.damageNewInput.set_value(damage_new)
         widget.damageLearningInput.set_value(damage_learning)
@@ -478,13 +601,26 @@ answering with 'Again'.")
         widget.damageNewInput.setEnabled(enable_damage)
         widget.damageLearningInput.setEnabled(enable_damage)
 
+    def get_data(widget: Any) -> dict[str, Any]:
+        enable_damage = widget.enableDamageInput.isChecked()
+        return {
+            'shareDrain': widget.shareDrain.get_value(),
+            'maxLife': widget.maxLifeInput.value(),
+            'recover': widget.recoverInput.value(),
+            'fullRecoverSpeed': widget.fullRecoverInput.value(),
+            'damage': widget.damageInput.value() if enable_damage else None,
+            'damageNew': widget.damageNewInput.value() if enable_damage else None,
+            'damageLearning': widget.damageLearningInput.value() if enable_damage else None,
+        }
+
     tab = generate_form()
-    load_data(tab, conf)
+    tab.load_data = partial(load_data, tab)
+    tab.get_data = partial(get_data, tab)
     return tab
 
 
 def _global_settings_restore_defaults(basic_tab: Any, bar_style_tab: Any,
-                                      deck_defaults_tab: Any) -> None:
+                                      deck_defaults_tab: Any, answers_tab: Any) -> None:
     basic_tab.enableAddon.set_value(DEFAULTS['enable'])
     basic_tab.stopOnAnswer.set_value(DEFAULTS['stopOnAnswer'])
     basic_tab.stopOnLostFocus.set_value(DEFAULTS['stopOnLostFocus'])
@@ -492,6 +628,8 @@ def _global_settings_restore_defaults(basic_tab: Any, bar_style_tab: Any,
     basic_tab.behavUndo.set_value(DEFAULTS['behavUndo'])
     basic_tab.behavBury.set_value(DEFAULTS['behavBury'])
     basic_tab.behavSuspend.set_value(DEFAULTS['behavSuspend'])
+    basic_tab.undoDepth.set_value(DEFAULTS['undoDepth'])
+    basic_tab.enableDiagnostics.set_value(DEFAULTS['enableDiagnostics'])
     basic_tab.globalShortcut.set_value(DEFAULTS['globalSettingsShortcut'])
     basic_tab.deckShortcut.set_value(DEFAULTS['deckSettingsShortcut'])
     basic_tab.pauseShortcut.set_value(DEFAULTS['pauseShortcut'])
@@ -524,34 +662,48 @@ def _global_settings_restore_defaults(basic_tab: Any, bar_style_tab: Any,
     deck_defaults_tab.damageNewInput.setEnabled(enable_damage)
     deck_defaults_tab.damageLearningInput.setEnabled(enable_damage)
 
+    answers_tab.customAnswers.set_value(DEFAULTS['answerMatrix'] is not None)
+
 
 def deck_settings(aqt: Any, mw: AnkiQt, config: DeckConf, global_config: GlobalConf,
                   deck_manager: DeckManager) -> None:
     """Opens a dialog with the Deck Settings."""
+    if mw.col is None:
+        raise GetCollectionError
 
-    def save() -> None:
-        enable_damage = damage_tab.enableDamageInput.isChecked()
-
-        damage = None
-        damage_new = None
-        damage_learning = None
-        if enable_damage:
-            damage = damage_tab.damageInput.value()
-            damage_new = damage_tab.damageNewInput.value()
-            damage_learning = damage_tab.damageLearningInput.value()
-
-        conf = config.get()
-        conf.update({
+    dialog = _dialogs.get('deck')
+    if dialog is None:
+        dialog = _deck_settings_dialog(aqt, mw, config, global_config, deck_manager)
+        _dialogs['deck'] = dialog
+
+    conf = config.get()
+    dialog.setWindowTitle(f'Life Drain Deck Settings for {mw.col.decks.name(conf["id"])}')
+
+    global_conf = global_config.get()
+    if global_conf['shareDrain']:
+        conf = global_conf
+
+    dialog.load_data(conf, deck_manager.get_current_life())
+    dialog.exec()
+
+
+def _deck_settings_dialog(aqt: Any, mw: AnkiQt, config: DeckConf, global_config: GlobalConf,
+                          deck_manager: DeckManager) -> Any:
+
+    def form_conf() -> dict[str, Any]:
+        return {
+            **config.get(),
             'enable': basic_tab.enable.isChecked(),
             'maxLife': basic_tab.maxLifeInput.value(),
             'recover': basic_tab.recoverInput.value(),
             'fullRecoverSpeed': basic_tab.fullRecoverInput.value(),
-            'damage': damage,
-            'damageNew': damage_new,
-            'damageLearning': damage_learning,
+            **damage_tab.get_data(),
+            'answerMatrix': answers_tab.get_data(),
             'currentValue': basic_tab.currentValueInput.value(),
-        })
+        }
 
+    def save() -> None:
+        conf = form_conf()
         global_conf = global_config.get()
         if global_conf['shareDrain']:
             global_config.update(conf)
@@ -562,30 +714,45 @@ def deck_settings(aqt: Any, mw: AnkiQt, config: DeckConf, global_config: GlobalC
         deck_manager.set_deck_conf(conf, update_life=True)
         return dialog.accept()
 
+    def suggest() -> None:
+        _deck_settings_suggest(aqt, mw, basic_tab.maxLifeInput, form_conf(),
+                               stop_on_answer=global_config.get()['stopOnAnswer'])
+
+    def update_answers(*_: Any) -> None:
+        answers_tab.update_data(form_conf())
+
     def clicked(button: Any) -> None:
         if button_box.buttonRole(button) == aqt.QDialogButtonBox.ButtonRole.ResetRole:
-            _deck_settings_restore_defaults(basic_tab, damage_tab)
-
-    conf = config.get()
-    dialog = aqt.QDialog(mw)
-    dialog.setWindowTitle(f'Life Drain Deck Settings for {conf["name"]}')
+            _deck_settings_restore_defaults(basic_tab, damage_tab, answers_tab)
+            update_answers()
+        elif button == suggest_button:
+            suggest()
 
-    global_conf = global_config.get()
-    if global_conf['shareDrain']:
-        conf = global_conf
+    def load_data(conf: Mapping[str, Any], life: float) -> None:
+        basic_tab.load_data(conf, life)
+        damage_tab.load_data(conf)
+        answers_tab.load_data(conf)
+        update_answers()
 
-    basic_tab = _deck_basic_tab(aqt, conf, deck_manager.get_current_life())
-    damage_tab = _deck_damage_tab(aqt, conf)
+    dialog = aqt.QDialog(mw)
+    basic_tab = _deck_basic_tab(aqt)
+    damage_tab = _deck_damage_tab(aqt)
+    answers_tab = _deck_answers_tab(aqt)
 
     tab_widget = aqt.QTabWidget()
     tab_widget.addTab(basic_tab, 'Basic')
     tab_widget.addTab(damage_tab, 'Damage')
+    tab_widget.addTab(answers_tab, 'Answers')
+    tab_widget.currentChanged.connect(update_answers)
+    answers_tab.customAnswers.stateChanged.connect(update_answers)
 
     button_box = aqt.QDialogButtonBox(
         aqt.QDialogButtonBox.StandardButton.Ok |
         aqt.QDialogButtonBox.StandardButton.Cancel |
         aqt.QDialogButtonBox.StandardButton.RestoreDefaults,
     )
+    suggest_button = button_box.addButton('Suggest', aqt.QDialogButtonBox.ButtonRole.ActionRole)
+    suggest_button.setToolTip('Suggest a maximum life based on the review history of this deck.')
     button_box.rejected.connect(dialog.reject)
     button_box.accepted.connect(save)
     button_box.clicked.connect(clicked)
@@ -595,10 +762,97 @@ def deck_settings(aqt: Any, mw: AnkiQt, config: DeckConf, global_config: GlobalC
     outer_form.add_widget(button_box)
 
     dialog.setMinimumSize(300, 210)
-    dialog.exec()
+    dialog.load_data = load_data
+    return dialog
 
 
-def _deck_basic_tab(aqt: Any, conf: dict[str, Any], life: float) -> Any:
+def _deck_settings_suggest(aqt: Any, mw: AnkiQt, max_life_input: Any, conf: dict[str, Any], *,
+                           stop_on_answer: bool) -> None:
+    """Suggests a maximum life from the deck's review history.
+
+    Asks the user for a target game over rate, and analyzes the reviews in the
+    background, showing Anki's progress window, as it may take seconds without
+    NumPy. Then shows the result, and fills the maximum life if the user
+    accepts it.
+
+    Args:
+        aqt: The PyQt library.
+        mw: Anki's main window.
+        max_life_input: The maximum life field of the Deck Settings.
+        conf: The settings in the dialog.
+        stop_on_answer: Is the drain stopped while the answer is shown?
+    """
+    parent = max_life_input.window()
+    target, accepted = aqt.QInputDialog.getDouble(
+        parent, 'Life Drain', 'Target game over rate (% of review sessions):', 10, 0, 100, 1)
+    if not accepted:
+        return
+    if mw.col is None:
+        raise GetCollectionError
+
+    from aqt.operations import QueryOp  # noqa: PLC0415 (only needed for the analysis)
+
+    from . import analysis  # noqa: PLC0415 (loads NumPy)
+    deck_ids = mw.col.decks.deck_and_child_ids(conf['id'])
+
+    def run(col: Collection) -> analysis.Analysis:
+        reviews = analysis.load_reviews(col, deck_ids)
+        return analysis.analyze(reviews, conf, target / 100, stop_on_answer=stop_on_answer)
+
+    QueryOp(
+        parent=parent,
+        op=run,
+        success=partial(_deck_settings_suggestion, aqt, max_life_input, conf, target),
+    ).with_progress('Analyzing the review history...').run_in_background()
+
+
+def _deck_settings_suggestion(aqt: Any, max_life_input: Any, conf: dict[str, Any],
+                              target: float, result: Any) -> None:
+    """Shows the result of analysis.analyze, and fills the maximum life if accepted.
+
+    Args:
+        aqt: The PyQt library.
+        max_life_input: The maximum life field of the Deck Settings.
+        conf: The settings in the dialog.
+        target: The target game over rate, in %.
+        result: The result of the analysis.
+    """
+    parent = max_life_input.window()
+    if result.sessions == 0:
+        aqt.QMessageBox.information(parent, 'Life Drain', 'There are no reviews to analyze.')
+        return
+
+    suggestion = next(item for item in result.suggestions
+                      if item.recover == round(conf['recover']))
+    answer = aqt.QMessageBox.question(
+        parent, 'Life Drain', _suggestions_text(result, conf, target) + f'''
+
+Use a maximum life of {suggestion.max_life} seconds?''')
+    if answer == aqt.QMessageBox.StandardButton.Yes:
+        max_life_input.set_value(suggestion.max_life)
+
+
+def _suggestions_text(result: Any, conf: Mapping[str, Any], target: float) -> str:
+    """Describes the result of analysis.analyze."""
+    current_rate = f'{result.current_rate:.0%}'
+    lines = [
+        f'Analyzed {result.reviews} reviews in {result.sessions} sessions.',
+        f'With the current settings, life reaches 0 in {current_rate} of the sessions.',
+        '',
+        f'Maximum life for life to reach 0 in {target:g}% of the sessions:',
+    ]
+    for suggestion in result.suggestions:
+        notes = []
+        if suggestion.recover == round(conf['recover']):
+            notes.append('current recover')
+        if suggestion.game_over_rate > target / 100:
+            notes.append(f'reaches 0 in {suggestion.game_over_rate:.0%}')
+        note = f' ({", ".join(notes)})' if notes else ''
+        lines.append(f'  Recover {suggestion.recover}s: maximum life {suggestion.max_life}s{note}')
+    return '\n'.join(lines)
+
+
+def _deck_basic_tab(aqt: Any) -> Any:
 
     def generate_form() -> Any:
         tab = Form(aqt)
@@ -618,7 +872,7 @@ The recover will stop once life reaches 0, maximum, or when leaving deck overvie
         tab.fill_space()
         return tab.widget
 
-    def load_data(widget: Any, conf: dict[str, Any]) -> None:
+    def load_data(widget: Any, conf: Mapping[str, Any], life: float) -> None:
         widget.enable.set_value(conf['enable'])
         widget.maxLifeInput.set_value(conf['maxLife'])
         widget.recoverInput.set_value(conf['recover'])
@@ -626,11 +880,11 @@ The recover will stop once life reaches 0, maximum, or when leaving deck overvie
         widget.fullRecoverInput.set_value(conf['fullRecoverSpeed'])
 
     tab = generate_form()
-    load_data(tab, conf)
+    tab.load_data = partial(load_data, tab)
     return tab
 
 
-def _deck_damage_tab(aqt: Any, conf: dict[str, Any]) -> Any:
+def _deck_damage_tab(aqt: Any) -> Any:
 
     def generate_form() -> Any:
         tab = Form(aqt)
@@ -644,22 +898,24 @@ answering with 'Again'.")
         tab.spin_box('damageInput', 'Review cards', [-1000, 1000],
                      'Damage value on review cards.')
         tab.fill_space()
-        return tab.widget
+        widget = tab.widget
 
-    def load_data(widget: Any, conf: dict[str, Any]) -> None:
         def update_damageinput() -> None:
             damage_enabled = widget.enableDamageInput.isChecked()
             widget.damageInput.setEnabled(damage_enabled)
             widget.damageNewInput.setEnabled(damage_enabled)
             widget.damageLearningInput.setEnabled(damage_enabled)
 
+        widget.enableDamageInput.stateChanged.connect(update_damageinput)
+        return widget
+
+    def load_data(widget: Any, conf: Mapping[str, Any]) -> None:
         enable_damage = conf['damage'] is not None
         damage = conf['damage'] if enable_damage else 5
         damage_new = conf['damageNew'] if conf['damageNew'] is not None else damage
         damage_learning = conf['damageLearning'] if conf['damageLearning'] is not None else damage
 
         widget.enableDamageInput.set_value(enable_damage)
-        widget.enableDamageInput.stateChanged.connect(update_damageinput)
         widget.damageInput.set_value(damage)
         widget.damageNewInput.set_value(damage_new)
         widget.damageLearningInput.set_value(damage_learning)
@@ -668,11 +924,56 @@ answering with 'Again'.")
         widget.damageNewInput.setEnabled(enable_damage)
         widget.damageLearningInput.setEnabled(enable_damage)
 
+    def get_data(widget: Any) -> dict[str, Optional[int]]:
+        if not widget.enableDamageInput.isChecked():
+            return {'damage': None, 'damageNew': None, 'damageLearning': None}
+        return {
+            'damage': widget.damageInput.value(),
+            'damageNew': widget.damageNewInput.value(),
+            'damageLearning': widget.damageLearningInput.value(),
+        }
+
+    tab = generate_form()
+    tab.load_data = partial(load_data, tab)
+    tab.get_data = partial(get_data, tab)
+    return tab
+
+
+def _deck_answers_tab(aqt: Any) -> Any:
+
+    def generate_form() -> Any:
+        tab = Form(aqt)
+        tab.check_box('customAnswers', 'Custom answer table', '''Set the life change of each \
+answer by card type and button, instead of using the recover and damage settings.''')
+        tab.spin_box_grid('answerMatrixInput', CARD_TYPES, EASES, [-1000, 1000], '''Time in \
+seconds that is recovered after each answer. Negative values are damage.''')
+        tab.fill_space()
+        return tab.widget
+
+    def load_data(widget: Any, conf: Mapping[str, Any]) -> None:
+        widget.customAnswers.set_value(conf['answerMatrix'] is not None)
+        widget.answerMatrixInput.set_value(answer_matrix(conf))
+
+    def update_data(widget: Any, conf: Mapping[str, Any]) -> None:
+        """Shows the answers given by the recover and damage settings, unless custom."""
+        custom = widget.customAnswers.isChecked()
+        if not custom:
+            widget.answerMatrixInput.set_value(answer_matrix(conf))
+        widget.answerMatrixInput.setEnabled(custom)
+
+    def get_data(widget: Any) -> Optional[list[list[int]]]:
+        if not widget.customAnswers.isChecked():
+            return None
+        return widget.answerMatrixInput.get_value()
+
     tab = generate_form()
-    load_data(tab, conf)
+    tab.load_data = partial(load_data, tab)
+    tab.update_data = partial(update_data, tab)
+    tab.get_data = partial(get_data, tab)
     return tab
 
-def _deck_settings_restore_defaults(basic_tab: Any, damage_tab: Any) -> None:
+
+def _deck_settings_restore_defaults(basic_tab: Any, damage_tab: Any, answers_tab: Any) -> None:
     basic_tab.enable.set_value(DEFAULTS['enable'])
     basic_tab.maxLifeInput.set_value(DEFAULTS['maxLife'])
     basic_tab.recoverInput.set_value(DEFAULTS['recover'])
@@ -687,3 +988,5 @@ def _deck_settings_restore_defaults(basic_tab: Any, damage_tab: Any) -> None:
     damage_tab.damageInput.setEnabled(enable_damage)
     damage_tab.damageNewInput.setEnabled(enable_damage)
     damage_tab.damageLearningInput.setEnabled(enable_damage)
+
+    answers_tab.customAnswers.set_value(DEFAULTS['answerMatrix'] is not None)
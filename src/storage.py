@@ -0,0 +1,151 @@
+# Copyright (c) Yutsuten <https://github.com/Yutsuten>. Licensed under AGPL-3.0.
+# See the LICENCE file in the repository root for full licence text.
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from typing import TYPE_CHECKING, Any, Mapping, NamedTuple, Optional, Union
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+STATE_STORE_FILE = 'lifedrain.db'
+MIGRATIONS = (  # The database's user_version is the number of migrations applied
+    '''
+    CREATE TABLE IF NOT EXISTS bar_state (
+        deck_id TEXT PRIMARY KEY,
+        life INTEGER NOT NULL,
+        history BLOB NOT NULL
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE deck_conf (
+        deck_id INTEGER PRIMARY KEY,
+        conf TEXT NOT NULL
+    )
+    ''',
+)
+DECK_CONF_VERSION = 2  # Migration that creates deck_conf, importing the configuration's decks
+
+
+class Snapshot(NamedTuple):
+    """The runtime state of a life bar, as stored in the StateStore."""
+    life: int
+    history: bytes  # As given by LifeHistory.to_bytes
+
+
+class StateStore:
+    """SQLite database of the decks' configuration and life bars, per profile.
+
+    Holds one row per deck in each table, looked up by its primary key, so
+    reading or writing a deck does not touch the others. The `deck_conf` table
+    replaces the `decks` entry of the add-on configuration. The `bar_state` table
+    keeps the latest snapshot of each life bar. Until a profile is opened, an
+    in-memory database is used. Changes are committed by `flush` and `close`.
+
+    The database uses a write-ahead log with synchronous=NORMAL: a commit
+    appends to the log without waiting for the disk, so committing on the main
+    thread is cheap. Committed changes survive a crash of Anki, though not
+    necessarily a power loss.
+    """
+
+    def __init__(self) -> None:
+        self._path: Optional[Path] = None
+        self._db = self._connect(':memory:')
+
+    @property
+    def path(self) -> Optional[Path]:
+        """The database file of the open profile."""
+        return self._path
+
+    def open(self, path: Path, legacy_decks: Optional[Mapping[str, Any]]=None) -> None:
+        """Starts using a database file, closing the previous one.
+
+        The database is migrated to the current schema. This happens once per
+        profile, so the deck configuration shared by every profile in the
+        add-on configuration is imported into each of them.
+
+        Args:
+            path: The database file. Created if it does not exist.
+            legacy_decks: Optional. The `decks` entry of the add-on
+                configuration, imported when the deck_conf table is created.
+        """
+        self.close()
+        self._db.close()
+        self._db = self._connect(str(path), legacy_decks)
+        self._path = path
+
+    def close(self) -> None:
+        """Commits the changes and goes back to an in-memory database."""
+        if self._path is None:
+            return
+        self.flush()
+        self._db.close()
+        self._db = self._connect(':memory:')
+        self._path = None
+
+    def flush(self) -> None:
+        """Commits the changes."""
+        self._db.commit()
+
+    def load_deck_conf(self, deck_id: int) -> Optional[dict[str, Any]]:
+        """Gets a deck's own configuration, if it has one.
+
+        Args:
+            deck_id: The deck's ID.
+        """
+        row = self._db.execute(
+            'SELECT conf FROM deck_conf WHERE deck_id = ?', (deck_id,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def save_deck_conf(self, deck_id: int, conf: Mapping[str, Any]) -> None:
+        """Stores a deck's configuration and commits it, so a crash does not lose it.
+
+        Args:
+            deck_id: The deck's ID.
+            conf: The deck's own configuration.
+        """
+        self._db.execute(
+            'INSERT OR REPLACE INTO deck_conf (deck_id, conf) VALUES (?, ?)',
+            (deck_id, json.dumps(conf)))
+        self.flush()
+
+    def save_bar_state(self, deck_id: Union[int, str], snapshot: Snapshot) -> None:
+        """Stores the state of a deck's life bar, replacing the previous one.
+
+        Args:
+            deck_id: The deck's ID, or 'shared'.
+            snapshot: The state of the life bar.
+        """
+        self._db.execute(
+            'INSERT OR REPLACE INTO bar_state (deck_id, life, history) VALUES (?, ?, ?)',
+            (str(deck_id), *snapshot))
+
+    def load_bar_state(self, deck_id: Union[int, str]) -> Optional[Snapshot]:
+        """Gets the stored state of a deck's life bar, if any.
+
+        Args:
+            deck_id: The deck's ID, or 'shared'.
+        """
+        row = self._db.execute(
+            'SELECT life, history FROM bar_state WHERE deck_id = ?', (str(deck_id),)).fetchone()
+        return None if row is None else Snapshot(*row)
+
+    @staticmethod
+    def _connect(database: str,
+                 legacy_decks: Optional[Mapping[str, Any]]=None) -> sqlite3.Connection:
+        """Opens a database, applying the migrations it does not have yet."""
+        db = sqlite3.connect(database)
+        db.execute('PRAGMA journal_mode = WAL')
+        db.execute('PRAGMA synchronous = NORMAL')
+        version = db.execute('PRAGMA user_version').fetchone()[0]
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            db.execute(migration)
+            if number == DECK_CONF_VERSION and legacy_decks:
+                db.executemany(
+                    'INSERT INTO deck_conf (deck_id, conf) VALUES (?, ?)',
+                    ((int(deck_id), json.dumps(conf)) for deck_id, conf in legacy_decks.items()))
+            db.execute(f'PRAGMA user_version = {number}')
+        db.commit()
+        return db
@@ -0,0 +1,377 @@
+# Copyright (c) Yutsuten <https://github.com/Yutsuten>. Licensed under AGPL-3.0.
+# See the LICENCE file in the repository root for full licence text.
+
+"""Benchmarks of Life Drain's review hot paths.
+
+Drives the code run on every timer tick, card and answer through the stand-ins
+of `standins.py`, and reports the latency of each call and the memory it
+allocates as JSON. The time to import the add-on, as done by Anki on startup, is
+measured in fresh interpreters.
+
+The results are compared with another git revision of the add-on, or with a
+stored baseline, and a benchmark is reported as a regression when its median
+latency grows more than the tolerance. The speed of a machine drifts too much
+between runs for a stored baseline to be reliable, so a revision is measured in
+the same interpreter: both copies of the add-on are loaded side by side, and
+their calls are measured in alternating chunks, so that a slower period affects
+both alike. Baselines are machine dependent: save a new one before comparing on
+a different computer, and whenever a hot path changes.
+
+Usage:
+    python tools/benchmark.py --against HEAD    # Compare with the last commit
+    python tools/benchmark.py                   # Compare with the baseline
+    python tools/benchmark.py --save-baseline   # Store the results as baseline
+"""
+
+from __future__ import annotations
+
+import argparse
+import compileall
+import gc
+import io
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+from typing import Any, Callable, Optional, Sequence
+
+import standins
+from loader import PACKAGE, SRC, load
+
+standins.install()
+
+TOOLS = Path(__file__).resolve().parent
+BASELINE = TOOLS / 'benchmark_baseline.json'
+IMPORTED_MODULES = ('main', 'settings')
+REFERENCE_PACKAGE = 'lifedrain_reference'  # The revision compared with
+
+IMPORT_SCRIPT = '''
+import json, sys, time
+from pathlib import Path
+sys.path.insert(0, {tools!r})
+import standins
+standins.install()
+from loader import PACKAGE, load
+start = time.perf_counter_ns()
+load({module!r}, src=Path({src!r}))
+elapsed = time.perf_counter_ns() - start
+print(json.dumps({{
+    'ns': elapsed,
+    'modules': sorted(name for name in sys.modules if name.startswith(PACKAGE + '.')),
+}}))
+'''
+
+
+def make_lifedrain(package: str=PACKAGE, src: Path=SRC) -> Any:
+    """Creates a Life Drain instance that is reviewing a deck.
+
+    A profile is opened in a temporary folder, so that the changes of life are
+    recorded in an event log and a state store, as in Anki. Hooks that older
+    revisions do not have are skipped, so that they can be compared too.
+
+    Args:
+        package: Optional. The package name of the copy of the add-on to use.
+        src: Optional. The `src` folder of that copy.
+    """
+    lifedrain_module = load('lifedrain', package, src)
+    defaults = load('defaults', package, src)
+    config = {**defaults.DEFAULTS, 'stopOnAnswer': False}
+    mw = standins.MainWindow(config)
+    lifedrain = lifedrain_module.Lifedrain(mw, standins.make_qt())
+    for hook in ('profile_opened', 'collection_loaded'):
+        if hasattr(lifedrain, hook):
+            getattr(lifedrain, hook)()
+    lifedrain.screen_change('review')
+    return lifedrain
+
+
+def make_benchmarks(package: str=PACKAGE, src: Path=SRC) -> dict[str, Callable[[], Any]]:
+    """Creates the functions to be measured, each doing a single call.
+
+    Args:
+        package: Optional. The package name of the copy of the add-on to measure.
+        src: Optional. The `src` folder of that copy.
+    """
+    lifedrain = make_lifedrain(package, src)
+    deck_manager = lifedrain.deck_manager
+    card = standins.Card()
+
+    def show_question() -> None:
+        lifedrain.status['reviewed'] = True
+        lifedrain.status['review_response'] = 3
+        lifedrain.show_question(card)
+
+    def screen_change() -> None:
+        lifedrain.status['reviewed'] = True
+        lifedrain.status['review_response'] = 3
+        lifedrain.screen_change('review')
+
+    start_timer = getattr(deck_manager, 'start_timer', deck_manager.timer.start)
+
+    def life_timer() -> None:
+        start_timer()
+        deck_manager.life_timer()
+
+    progress_bar = deck_manager._progress_bar  # noqa: SLF001
+    life_scale = getattr(load('progress_bar', package, src), 'LIFE_SCALE', None)
+    step = [-0.25 if life_scale is None else -life_scale // 4]  # Older revisions use seconds
+
+    def inc_current_value() -> None:
+        value = progress_bar.get_current_value()
+        progress_bar.inc_current_value(step[0])
+        if progress_bar.get_current_value() == value:  # Reached an end of the bar
+            step[0] = -step[0]
+
+    return {
+        'Lifedrain.show_question': show_question,
+        'Lifedrain.show_answer': lifedrain.show_answer,
+        'Lifedrain.screen_change': screen_change,
+        'DeckManager.life_timer': life_timer,
+        'DeckManager.answer': lambda: deck_manager.answer(3, 2),
+        'DeckManager.undo': deck_manager.undo,
+        'ProgressBar.inc_current_value': inc_current_value,
+    }
+
+
+def percentile(ordered: list[int], fraction: float) -> int:
+    """Gets a percentile of an ordered list."""
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def time_calls(func: Callable[[], Any], calls: int) -> list[int]:
+    """Measures the latency of each call of a function, in nanoseconds."""
+    timings = [0] * calls
+    clock = time.perf_counter_ns
+    gc.disable()
+    try:
+        for i in range(calls):
+            start = clock()
+            func()
+            timings[i] = clock() - start
+    finally:
+        gc.enable()
+    return timings
+
+
+def measure_allocations(func: Callable[[], Any], calls: int) -> tuple[int, int]:
+    """Measures the memory allocated by calls of a function.
+
+    Returns:
+        The peak memory in use above the starting point (temporary objects),
+        and the memory still in use at the end (growth), in bytes.
+    """
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for _ in range(calls):
+            func()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - before, after - before
+
+
+def measure(funcs: Sequence[Callable[[], Any]], calls: int,
+            chunks: int) -> list[dict[str, Any]]:
+    """Measures the latency and the allocations of versions of a function.
+
+    Latency is measured call by call with tracing off. The calls are split into
+    chunks, and the chunks of the versions alternate. Allocations are measured
+    in a second run.
+
+    Args:
+        funcs: The function of each copy of the add-on.
+        calls: The number of calls measured per version.
+        chunks: The number of chunks the calls are split into.
+
+    Returns:
+        The results of each version, in the same order.
+    """
+    for func in funcs:
+        for _ in range(calls // 10):
+            func()
+
+    timings: list[list[int]] = [[] for _ in funcs]
+    chunk_calls = max(calls // chunks, 1)
+    for chunk in range(chunks):
+        order = range(len(funcs)) if chunk % 2 == 0 else reversed(range(len(funcs)))
+        for index in order:
+            timings[index].extend(time_calls(funcs[index], chunk_calls))
+
+    results = []
+    for func, func_timings in zip(funcs, timings):
+        func_timings.sort()
+        peak, growth = measure_allocations(func, calls)
+        results.append({
+            'calls': len(func_timings),
+            'mean_ns': sum(func_timings) // len(func_timings),
+            'p50_ns': percentile(func_timings, 0.5),
+            'p95_ns': percentile(func_timings, 0.95),
+            'max_ns': func_timings[-1],
+            'peak_bytes': peak,
+            'retained_bytes_per_call': growth / len(func_timings),
+        })
+    return results
+
+
+def measure_import(module: str, runs: int, sources: Sequence[Path]) -> list[dict[str, Any]]:
+    """Measures the time to import a module of the add-on, and its dependencies.
+
+    Each import runs in a new interpreter, alternating between the copies of
+    the add-on. Their bytecode must be compiled beforehand.
+
+    Args:
+        module: The module name.
+        runs: The number of imports measured per copy.
+        sources: The `src` folder of each copy of the add-on.
+
+    Returns:
+        The results of each copy, in the same order.
+    """
+    timings: list[list[int]] = [[] for _ in sources]
+    modules: list[list[str]] = [[] for _ in sources]
+    for run in range(runs):
+        order = range(len(sources)) if run % 2 == 0 else reversed(range(len(sources)))
+        for index in order:
+            script = IMPORT_SCRIPT.format(tools=str(TOOLS), module=module, src=str(sources[index]))
+            output = subprocess.run(  # noqa: S603
+                [sys.executable, '-c', script], capture_output=True, check=True, text=True)
+            result = json.loads(output.stdout)
+            timings[index].append(result['ns'])
+            modules[index] = result['modules']
+
+    results = []
+    for source_timings, source_modules in zip(timings, modules):
+        source_timings.sort()
+        results.append({
+            'calls': runs,
+            'mean_ns': sum(source_timings) // runs,
+            'p50_ns': percentile(source_timings, 0.5),
+            'p95_ns': percentile(source_timings, 0.95),
+            'max_ns': source_timings[-1],
+            'modules': source_modules,
+        })
+    return results
+
+
+def export_revision(revision: str, folder: Path) -> Path:
+    """Extracts the `src` folder of a git revision.
+
+    Args:
+        revision: The revision, e.g. HEAD.
+        folder: Where to extract it.
+
+    Returns:
+        The extracted `src` folder.
+    """
+    archive = subprocess.run(  # noqa: S603
+        ['git', 'archive', '--format=zip', revision, 'src'],  # noqa: S607
+        capture_output=True, check=True, cwd=SRC.parent).stdout
+    with zipfile.ZipFile(io.BytesIO(archive)) as zipped:
+        zipped.extractall(folder)
+    return folder / 'src'
+
+
+def run_benchmarks(args: argparse.Namespace, packages: Sequence[str],
+                   sources: Sequence[Path]) -> list[dict[str, dict[str, Any]]]:
+    """Runs every benchmark on each copy of the add-on.
+
+    Args:
+        args: The command line arguments.
+        packages: The package name of each copy of the add-on.
+        sources: The `src` folder of each copy.
+
+    Returns:
+        The results of each copy, by benchmark name.
+    """
+    for src in sources:
+        compileall.compile_dir(src, quiet=1)  # Imports would also measure the compilation
+    results: list[dict[str, dict[str, Any]]] = [{} for _ in sources]
+    benchmarks = [make_benchmarks(package, src) for package, src in zip(packages, sources)]
+    for name in benchmarks[0]:
+        if args.filter in name:
+            measured = measure(
+                [funcs[name] for funcs in benchmarks], args.calls, args.chunks)
+            for source_results, result in zip(results, measured):
+                source_results[name] = result
+    for module in IMPORTED_MODULES:
+        name = f'import {module}'
+        if args.filter in name:
+            for source_results, result in zip(
+                    results, measure_import(module, args.import_runs, sources)):
+                source_results[name] = result
+    return results
+
+
+def compare(results: dict[str, dict[str, Any]], baseline: dict[str, dict[str, Any]],
+            tolerance: float) -> dict[str, dict[str, Any]]:
+    """Compares the median latency of each benchmark with a baseline or another revision."""
+    comparison = {}
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['p50_ns'] / max(baseline[name]['p50_ns'], 1)
+        comparison[name] = {
+            'ratio': round(ratio, 3),
+            'regression': ratio > 1 + tolerance,
+        }
+    return comparison
+
+
+def parse_args(argv: Optional[list[str]]=None) -> argparse.Namespace:
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=20_000,
+                        help='Number of calls measured per benchmark.')
+    parser.add_argument('--chunks', type=int, default=20,
+                        help='Number of chunks the calls are split into, alternating revisions.')
+    parser.add_argument('--import-runs', type=int, default=20,
+                        help='Number of interpreters started per import measurement.')
+    parser.add_argument('--against', metavar='REVISION',
+                        help='Compare with a git revision, e.g. HEAD, instead of the baseline.')
+    parser.add_argument('--filter', default='',
+                        help='Only run the benchmarks whose name contains this text.')
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Store the results as the new baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown of the median latency, as a fraction.')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]]=None) -> int:
+    """Runs the benchmarks from the command line.
+
+    Returns:
+        The exit status: 1 if any benchmark regressed, 0 otherwise.
+    """
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix='lifedrain-benchmark-') as folder:
+        packages, sources = [PACKAGE], [SRC]
+        if args.against:
+            packages.append(REFERENCE_PACKAGE)
+            sources.append(export_revision(args.against, Path(folder)))
+        results = run_benchmarks(args, packages, sources)
+    report: dict[str, Any] = {'python': sys.version.split()[0], 'results': results[0]}
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results[0], indent=2) + '\n', encoding='utf-8')
+    if args.against:
+        report['against'] = args.against
+        report['comparison'] = compare(results[0], results[1], args.tolerance)
+    elif not args.save_baseline and args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        report['comparison'] = compare(results[0], baseline, args.tolerance)
+
+    print(json.dumps(report, indent=2))
+    regressed = any(item['regression'] for item in report.get('comparison', {}).values())
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
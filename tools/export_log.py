@@ -0,0 +1,69 @@
+# Copyright (c) Yutsuten <https://github.com/Yutsuten>. Licensed under AGPL-3.0.
+# See the LICENCE file in the repository root for full licence text.
+
+"""Exports Life Drain's event log as CSV or JSON Lines.
+
+The log is found in the Anki profile folder, as `lifedrain_events.bin`. Records
+are streamed, so any log size can be exported. Records still buffered by a
+running Anki are only written when its profile is closed.
+
+Usage:
+    python tools/export_log.py PROFILE/lifedrain_events.bin --deck 1 --since 2024-01-01
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from loader import load
+
+export = load('export')
+
+
+def parse_time(text: str) -> int:
+    """Converts an ISO date or date and time to milliseconds since epoch.
+
+    Times without a time zone are taken as local time.
+    """
+    moment = datetime.fromisoformat(text)
+    if moment.tzinfo is None:
+        moment = moment.astimezone()
+    return int(moment.astimezone(timezone.utc).timestamp() * 1000)
+
+
+def parse_args(argv: Optional[list[str]]=None) -> argparse.Namespace:
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('log', type=Path, help='The event log file.')
+    parser.add_argument('--format', choices=export.FORMATS, default='csv')
+    parser.add_argument('--deck', type=int, default=None,
+                        help='Only this deck ID. Use 0 for the life shared by all decks.')
+    parser.add_argument('--since', type=parse_time, default=None,
+                        help='Only events at or after this date/time (ISO format).')
+    parser.add_argument('--until', type=parse_time, default=None,
+                        help='Only events before this date/time (ISO format).')
+    parser.add_argument('--output', type=Path, default=None,
+                        help='Output file. Defaults to the standard output.')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]]=None) -> None:
+    """Runs the export from the command line."""
+    args = parse_args(argv)
+    if not args.log.exists():
+        sys.exit(f'No such file: {args.log}')
+    records = export.select(args.log, args.deck, args.since, args.until)
+    lines = export.FORMATS[args.format](records)
+    if args.output is None:
+        sys.stdout.writelines(lines)
+        return
+    with args.output.open('w', encoding='utf-8', newline='') as output:
+        output.writelines(lines)
+
+
+if __name__ == '__main__':
+    main()
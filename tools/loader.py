@@ -0,0 +1,37 @@
+# Copyright (c) Yutsuten <https://github.com/Yutsuten>. Licensed under AGPL-3.0.
+# See the LICENCE file in the repository root for full licence text.
+
+"""Imports Life Drain's modules without starting the add-on.
+
+The add-on's `__init__.py` starts Life Drain inside Anki, so the `src` folder is
+registered as a package without running it. Only modules that do not depend on
+Anki can be loaded this way, unless stand-ins for `anki` and `aqt` are
+registered beforehand.
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+import types
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / 'src'
+PACKAGE = 'lifedrain'
+
+
+def load(module: str, package: str=PACKAGE, src: Path=SRC) -> types.ModuleType:
+    """Imports a module of the add-on.
+
+    Args:
+        module: The module name, relative to the `src` folder.
+        package: Optional. The package name to register the `src` folder as.
+            Another copy of the add-on (e.g. from a previous revision) may be
+            loaded alongside under a different name.
+        src: Optional. The `src` folder of that copy.
+    """
+    if package not in sys.modules:
+        package_module = types.ModuleType(package)
+        package_module.__path__ = [str(src)]
+        sys.modules[package] = package_module
+    return importlib.import_module(f'{package}.{module}')
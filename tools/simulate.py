@@ -0,0 +1,198 @@
+# Copyright (c) Yutsuten <https://github.com/Yutsuten>. Licensed under AGPL-3.0.
+# See the LICENCE file in the repository root for full licence text.
+
+"""Headless simulator of Life Drain's rules.
+
+Generates synthetic review sessions (timer ticks, answers, undos, buries and
+suspends) and runs them through DrainCore, without Anki. Useful to tune
+`maxLife`, `recover` and `damage` offline, and to measure the core's speed.
+
+Usage:
+    python tools/simulate.py --events 1000000 --max-life 120 --recover 5 --damage 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from array import array
+from typing import Any, Optional
+
+from loader import load
+
+bar_state = load('bar_state')
+defaults = load('defaults')
+drain_core = load('drain_core')
+
+TICK, ANSWER, UNDO, BURY, SUSPEND = range(5)
+EVENT_NAMES = ['tick', 'answer', 'undo', 'bury', 'suspend']
+
+
+def parse_answer_matrix(text: str) -> list[list[float]]:
+    """Parses the --answer-matrix argument, checking its shape."""
+    matrix = json.loads(text)
+    if not bar_state.is_answer_matrix(matrix):
+        message = 'expected a JSON list of 4 rows of 4 numbers'
+        raise argparse.ArgumentTypeError(message)
+    return matrix
+
+
+def parse_args(argv: Optional[list[str]]=None) -> argparse.Namespace:
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=1_000_000,
+                        help='Number of events to generate.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+    parser.add_argument('--max-life', type=int, default=defaults.DEFAULTS['maxLife'])
+    parser.add_argument('--recover', type=int, default=defaults.DEFAULTS['recover'])
+    parser.add_argument('--damage', type=int, default=None,
+                        help='Damage on review cards. Damage is disabled if omitted.')
+    parser.add_argument('--damage-new', type=int, default=None)
+    parser.add_argument('--damage-learning', type=int, default=None)
+    parser.add_argument('--answer-matrix', type=parse_answer_matrix, default=None,
+                        help='Life change of each answer by card type and ease, as a JSON '
+                             'list of 4 rows (new, learning, review, relearning) of 4 values '
+                             '(again, hard, good, easy). Replaces --recover and --damage*.')
+    parser.add_argument('--undo-depth', type=int, default=defaults.DEFAULTS['undoDepth'])
+    parser.add_argument('--start-empty', action='store_true')
+    parser.add_argument('--answer-time', type=float, default=8.0,
+                        help='Average time to answer a card, in seconds.')
+    parser.add_argument('--tick', type=int, default=100,
+                        help='Milliseconds between timer ticks.')
+    parser.add_argument('--again-rate', type=float, default=0.15)
+    parser.add_argument('--new-rate', type=float, default=0.1)
+    parser.add_argument('--learning-rate', type=float, default=0.1)
+    parser.add_argument('--relearning-rate', type=float, default=0.0)
+    parser.add_argument('--undo-rate', type=float, default=0.01)
+    parser.add_argument('--bury-rate', type=float, default=0.01)
+    parser.add_argument('--suspend-rate', type=float, default=0.005)
+    parser.add_argument('--behav-bury', type=int, default=defaults.DEFAULTS['behavBury'],
+                        choices=range(len(defaults.BEHAVIORS)))
+    parser.add_argument('--behav-suspend', type=int, default=defaults.DEFAULTS['behavSuspend'],
+                        choices=range(len(defaults.BEHAVIORS)))
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+    return parser.parse_args(argv)
+
+
+def generate_events(args: argparse.Namespace) -> tuple[array, array]:
+    """Generates the events of a synthetic session.
+
+    Returns:
+        The event types, and a value for each event: the elapsed milliseconds
+        for ticks, or the ease and card type (ease * 10 + card type) for answers.
+    """
+    rng = random.Random(args.seed)  # noqa: S311
+    kinds = array('b')
+    values = array('i')
+    special_rate = args.undo_rate + args.bury_rate + args.suspend_rate
+    remaining = 0
+    while len(kinds) < args.events:
+        if remaining > 0:
+            elapsed = min(args.tick, remaining)
+            remaining -= elapsed
+            kinds.append(TICK)
+            values.append(elapsed)
+            continue
+
+        roll = rng.random()
+        if roll < args.undo_rate:
+            kinds.append(UNDO)
+        elif roll < args.undo_rate + args.bury_rate:
+            kinds.append(BURY)
+        elif roll < special_rate:
+            kinds.append(SUSPEND)
+        else:
+            ease = 1 if rng.random() < args.again_rate else rng.choice((2, 3, 3, 3, 4))
+            roll = rng.random()
+            card_type = 2
+            if roll < args.new_rate:
+                card_type = 0
+            elif roll < args.new_rate + args.learning_rate:
+                card_type = 1
+            elif roll < args.new_rate + args.learning_rate + args.relearning_rate:
+                card_type = 3
+            kinds.append(ANSWER)
+            values.append(ease * 10 + card_type)
+            remaining = int(rng.expovariate(1 / args.answer_time) * 1000)
+            continue
+        values.append(0)
+    return kinds, values
+
+
+def run(args: argparse.Namespace, kinds: array, values: array) -> dict[str, Any]:
+    """Runs the events through DrainCore and collects statistics."""
+    conf = {
+        'enable': True,
+        'maxLife': args.max_life,
+        'recover': args.recover,
+        'fullRecoverSpeed': 0,
+        'damage': args.damage,
+        'damageNew': args.damage_new if args.damage_new is not None else args.damage,
+        'damageLearning': (
+            args.damage_learning if args.damage_learning is not None else args.damage),
+        'answerMatrix': args.answer_matrix,
+    }
+    game_overs = 0
+
+    def on_game_over() -> None:
+        nonlocal game_overs
+        game_overs += 1
+
+    core = drain_core.DrainCore(on_game_over=on_game_over)
+    state = core.new_state(conf, args.undo_depth, start_empty=args.start_empty)
+    counts = [0] * len(EVENT_NAMES)
+    time_at_zero = 0
+    life_at_answer = 0
+
+    tick, answer, undo, action = core.tick, core.answer, core.undo, core.action
+    start = time.perf_counter()
+    for kind, value in zip(kinds, values):
+        counts[kind] += 1
+        if kind == TICK:
+            tick(state, value)
+            if state.current_value == 0:
+                time_at_zero += value
+        elif kind == ANSWER:
+            life_at_answer += state.current_value
+            answer(state, value // 10, value % 10)
+        elif kind == UNDO:
+            undo(state)
+        elif kind == BURY:
+            action(state, args.behav_bury)
+        else:
+            action(state, args.behav_suspend)
+    duration = time.perf_counter() - start
+
+    answers = counts[ANSWER]
+    total_time = sum(value for kind, value in zip(kinds, values) if kind == TICK)
+    return {
+        'events': len(kinds),
+        'seconds': duration,
+        'events_per_second': len(kinds) / duration if duration else None,
+        'counts': dict(zip(EVENT_NAMES, counts)),
+        'game_overs': game_overs,
+        'game_overs_per_100_answers': 100 * game_overs / answers if answers else None,
+        'session_minutes': total_time / 60_000,
+        'time_at_zero_ratio': time_at_zero / total_time if total_time else None,
+        'average_life_at_answer': (
+            bar_state.to_seconds(life_at_answer // answers) if answers else None),
+        'final_life': bar_state.to_seconds(state.current_value),
+    }
+
+
+def main(argv: Optional[list[str]]=None) -> None:
+    """Runs the simulator from the command line."""
+    args = parse_args(argv)
+    kinds, values = generate_events(args)
+    report = run(args, kinds, values)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for key, value in report.items():
+        print(f'{key}: {value}')
+
+
+if __name__ == '__main__':
+    main()
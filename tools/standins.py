@@ -0,0 +1,252 @@
+# Copyright (c) Yutsuten <https://github.com/Yutsuten>. Licensed under AGPL-3.0.
+# See the LICENCE file in the repository root for full licence text.
+
+"""Lightweight stand-ins for Anki's main window, PyQt and the add-on manager.
+
+They implement just enough of the interfaces used by Life Drain to drive its
+review code paths without Anki, and do as little work as possible so that the
+measurements reflect Life Drain itself.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
+import types
+from pathlib import Path
+from typing import Any, Callable, NamedTuple, Optional
+
+
+class Anything:
+    """Accepts any attribute access or call, doing nothing."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        return Anything()
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return Anything()
+
+    def __iter__(self) -> Any:
+        return iter(())
+
+
+class Timer:
+    """Stand-in for QTimer. Never fires by itself."""
+
+    def __init__(self) -> None:
+        self._active = False
+
+    def start(self, msec: Optional[int]=None) -> None:
+        self._active = True
+
+    def stop(self) -> None:
+        self._active = False
+
+    def isActive(self) -> bool:
+        return self._active
+
+
+class ProgressManager:
+    """Stand-in for aqt.progress.ProgressManager."""
+
+    def __init__(self, mw: Any):
+        self.mw = mw
+
+    def timer(self, ms: int, func: Callable, repeat: bool, *args, **kwargs) -> Timer:
+        return Timer()
+
+
+class QProgressBar:
+    """Stand-in for QProgressBar."""
+
+    def __init__(self) -> None:
+        self._value = 0
+        self._format = ''
+        self._visible = False
+
+    def setValue(self, value: int) -> None:
+        self._value = value
+
+    def setFormat(self, text: str) -> None:
+        self._format = text
+
+    def setVisible(self, visible: bool) -> None:
+        self._visible = visible
+
+    def isVisible(self) -> bool:
+        return self._visible
+
+    def width(self) -> int:
+        return 1000
+
+    def update(self) -> None:
+        pass
+
+    def setRange(self, minimum: int, maximum: int) -> None:
+        pass
+
+    def setTextVisible(self, visible: bool) -> None:
+        pass
+
+    def setStyleSheet(self, css: str) -> None:
+        pass
+
+    def setPalette(self, palette: Any) -> None:
+        pass
+
+    def setStyle(self, style: Any) -> None:
+        pass
+
+    def setInvertedAppearance(self, invert: bool) -> None:
+        pass
+
+
+class QStyleFactory:
+    """Stand-in for QStyleFactory."""
+
+    @staticmethod
+    def keys() -> list[str]:
+        return ['Fusion']
+
+    @staticmethod
+    def create(name: str) -> Any:
+        return Anything()
+
+
+class AddonManager:
+    """Stand-in for aqt.addons.AddonManager, reading the config from memory.
+
+    The add-ons folder is a temporary directory, created when first used and
+    removed with the stand-in, or when the program exits.
+    """
+
+    def __init__(self, config: Optional[dict[str, Any]]=None):
+        self.config = config or {}
+        self._folder: Optional[tempfile.TemporaryDirectory] = None
+
+    def getConfig(self, module: str) -> dict[str, Any]:
+        return dict(self.config)
+
+    def addonFromModule(self, module: str) -> str:
+        return module.split('.', maxsplit=1)[0]
+
+    def addonsFolder(self, module: Optional[str]=None) -> str:
+        if self._folder is None:
+            self._folder = tempfile.TemporaryDirectory(prefix='lifedrain-addons-')
+        if module is None:
+            return self._folder.name
+        folder = Path(self._folder.name) / module
+        folder.mkdir(exist_ok=True)
+        return str(folder)
+
+    def addonMeta(self, module: str) -> dict[str, Any]:
+        path = Path(self.addonsFolder(module)) / 'meta.json'
+        return json.loads(path.read_text(encoding='utf-8')) if path.exists() else {}
+
+    def __getattr__(self, name: str) -> Any:
+        return Anything()
+
+
+class ProfileManager:
+    """Stand-in for aqt.profiles.ProfileManager.
+
+    The profile folder is a temporary directory, created when first used and
+    removed with the stand-in, or when the program exits.
+    """
+
+    def __init__(self) -> None:
+        self._folder: Optional[tempfile.TemporaryDirectory] = None
+
+    def profileFolder(self) -> str:
+        if self._folder is None:
+            self._folder = tempfile.TemporaryDirectory(prefix='lifedrain-profile-')
+        return self._folder.name
+
+
+class DeckNameId(NamedTuple):
+    """Stand-in for a deck's name and ID."""
+    name: str
+    id: int
+
+
+class Decks:
+    """Stand-in for the collection's deck manager.
+
+    Decks without a name set in `names` are top level decks named after their ID.
+    """
+
+    def __init__(self, deck_id: int=1):
+        self.current_id = deck_id
+        self.names: dict[int, str] = {}
+
+    def get_current_id(self) -> int:
+        return self.current_id
+
+    def current(self) -> dict[str, Any]:
+        return {'id': self.current_id, 'name': self.name(self.current_id)}
+
+    def name(self, deck_id: int) -> str:
+        return self.names.get(deck_id, f'Deck {deck_id}')
+
+    def all_names_and_ids(self) -> list[DeckNameId]:
+        return [DeckNameId(name, deck_id) for deck_id, name in self.names.items()]
+
+    def select(self, deck_id: int) -> None:
+        self.current_id = deck_id
+
+
+class Collection:
+    """Stand-in for the collection."""
+
+    def __init__(self) -> None:
+        self.decks = Decks()
+
+
+class MainWindow(Anything):
+    """Stand-in for Anki's main window."""
+
+    def __init__(self, config: Optional[dict[str, Any]]=None):
+        self.addonManager = AddonManager(config)
+        self.pm = ProfileManager()
+        self.col = Collection()
+
+
+class Card:
+    """Stand-in for a card."""
+
+    def __init__(self, card_type: int=2):
+        self.type = card_type
+
+
+def make_qt() -> Any:
+    """Creates a stand-in for the PyQt module namespace."""
+    qt = Anything()
+    qt.QProgressBar = QProgressBar
+    qt.QStyleFactory = QStyleFactory
+    return qt
+
+
+def install() -> None:
+    """Registers stand-in `anki` and `aqt` modules, if Anki is not installed."""
+    try:
+        import aqt  # noqa: F401, PLC0415
+    except ImportError:
+        pass
+    else:
+        return
+
+    modules = {
+        'anki': {},
+        'anki.hooks': {'runHook': lambda *args: None, 'notes_will_be_deleted': []},
+        'anki.decks': {'DeckId': int},
+        'aqt': {'gui_hooks': Anything(), 'mw': None, 'qt': make_qt()},
+        'aqt.progress': {'ProgressManager': ProgressManager},
+    }
+    for name, attributes in modules.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(attributes)
+        sys.modules[name] = module